@@ -0,0 +1,97 @@
+import numpy as np
+from ChessAI import *
+
+# evaluate many boards at once with numpy, give the same score as ChessAI.evaluate without cache.
+# a line is analysized step by step in board scan order like ChessAI.evaluateLine,
+# each step handles the same position of all lines of all boards
+class BatchEvaluator():
+	def __init__(self, chess_len):
+		self.len = chess_len
+		ai = ChessAI(chess_len, False)
+		lines = [ai.getLineCells(dir_index, line_id) for dir_index in range(4) for line_id in range(ai.getLineNum(dir_index))]
+		dirs = [dir_index for dir_index in range(4) for line_id in range(ai.getLineNum(dir_index))]
+		self.steps = max([len(line) for line in lines])
+		out_of_range = chess_len * chess_len
+
+		# board index of the line of fixed len 9 at each step of each line
+		self.index = np.full((self.steps, len(lines), 9), out_of_range, dtype=np.intp)
+		for line_id, line in enumerate(lines):
+			dir_offset = ai.dir_offset[dirs[line_id]]
+			for step, (x, y) in enumerate(line):
+				for i in range(9):
+					tmp_x = x + (i - 4) * dir_offset[0]
+					tmp_y = y + (i - 4) * dir_offset[1]
+					if tmp_x >= 0 and tmp_x < chess_len and tmp_y >= 0 and tmp_y < chess_len:
+						self.index[step, line_id, i] = tmp_y * chess_len + tmp_x
+
+		# lines of right diagonal are scanned from the end of line
+		self.reverse = np.array([dir_index == 3 for dir_index in dirs])
+		self.createPattern()
+
+	# a line of board values 0 to 3 is encoded as a base 4 number, and mapped to the index of
+	# LINE_PATTERN for the player of the middle chess. the index of player two is after player one,
+	# chess types of player two are after player one too, so one lookup gets types of both players
+	def createPattern(self):
+		self.power = 4 ** np.arange(9)
+		value = (np.arange(4**9)[:, None] // self.power) % 4
+		mine = value[:, 4:5]
+		pattern_index = np.where(value == 0, 0, np.where(value == mine, 1, 2)) @ (3 ** np.arange(9))
+		self.pattern = np.select([mine[:, 0] == 1, mine[:, 0] == 2], [pattern_index, 3**9 + pattern_index], 0)
+
+		self.types = np.zeros((2 * 3**9, 2 * CHESS_TYPE_NUM), dtype=np.int32)
+		self.records = np.zeros((2 * 3**9, 9), dtype=bool)
+		for index, pattern in enumerate(LINE_PATTERN):
+			if pattern is None:
+				continue
+			types, records = pattern
+			for type in types:
+				self.types[index, type] += 1
+				self.types[3**9 + index, CHESS_TYPE_NUM + type] += 1
+			self.records[index, list(records)] = True
+			self.records[3**9 + index, list(records)] = True
+
+	# chess type count of each player, shape is (N, 2, CHESS_TYPE_NUM)
+	def countTypes(self, boards):
+		boards = np.asarray(boards).reshape(len(boards), -1)
+		num, lines = boards.shape[0], self.index.shape[1]
+		# out of range position is MAP_NONE, it is the opponent of both players
+		flat = np.concatenate([boards, np.full((num, 1), MAP_ENTRY_TYPE.MAP_NONE.value, dtype=boards.dtype)], axis=1)
+		record = np.zeros((num, lines, self.steps + 8), dtype=bool)
+		count = np.zeros((num, 2 * CHESS_TYPE_NUM), dtype=np.int32)
+
+		for step in range(self.steps):
+			# index 0 is a line without chess at middle, it has no chess type and record
+			index = self.pattern[flat[:, self.index[step]] @ self.power]
+			index[record[:, :, step + 4]] = 0
+			count += self.types[index].sum(axis=1)
+
+			records = self.records[index]
+			records = np.where(self.reverse[None, :, None], records[:, :, ::-1], records)
+			record[:, :, step:step + 9] |= records
+		return count.reshape(num, 2, CHESS_TYPE_NUM)
+
+	# score of each board for turn, turns can be one turn for all boards or one for each board
+	def evaluate(self, boards, turns):
+		count = self.countTypes(boards)
+		turns = np.broadcast_to(np.asarray(turns, dtype=np.intp), (count.shape[0],))
+		rows = np.arange(count.shape[0])
+		return self.getScore(count[rows, turns - 1], count[rows, 2 - turns])
+
+	# same as ChessAI.getScore, return mscore - oscore
+	def getScore(self, mine_count, opponent_count):
+		mine_count, opponent_count = mine_count.copy(), opponent_count.copy()
+		mine_count[:, FOUR] += mine_count[:, SFOUR] >= 2
+		opponent_count[:, FOUR] += opponent_count[:, SFOUR] >= 2
+		m, o = mine_count.T, opponent_count.T
+
+		conditions = [m[FIVE] > 0, o[FIVE] > 0, m[FOUR] > 0, m[SFOUR] > 0, o[FOUR] > 0,
+			(o[SFOUR] > 0) & (o[THREE] > 0), (m[THREE] > 0) & (o[SFOUR] == 0),
+			(o[THREE] > 1) & (m[THREE] == 0) & (m[STHREE] == 0)]
+		scores = [SCORE_FIVE, -SCORE_FIVE, 9050, 9040, -9030, -9020, 9010, -9000]
+
+		mscore = np.select([m[THREE] > 1, m[THREE] > 0], [500, 100], 0)
+		mscore += m[STHREE] * 10 + m[TWO] * 6 + m[STWO] * 2
+		oscore = np.where(o[SFOUR] > 0, 400, 0)
+		oscore += np.select([o[THREE] > 1, o[THREE] > 0], [2000, 400], 0)
+		oscore += o[STHREE] * 10 + o[TWO] * 6 + o[STWO] * 2
+		return np.select(conditions, scores, mscore - oscore)
@@ -0,0 +1,117 @@
+from GameBoard import *
+import ChessAI
+import argparse
+import json
+import sys
+import time
+
+# search benchmark over a fixed set of positions, every run gives the same moves and node numbers
+# because zobrist codes use a fixed seed, so only time changes between runs of the same code
+BENCH_SEED = 1
+BENCH_DEPTHS = [2, 4, 6]
+BENCH_THRESHOLD = 0.1 # fail if nodes per second drops more than this ratio compared with baseline
+
+GAME = [(7, 7), (8, 8), (9, 7), (10, 8), (9, 8), (8, 7), (8, 6), (9, 6), (6, 8), (5, 9), (9, 5), (10, 4), (7, 5), (10, 5), (7, 8),
+		(7, 6), (8, 5), (6, 5), (8, 4), (10, 6), (10, 7), (11, 4), (12, 3), (12, 4), (13, 4), (8, 3), (11, 6), (12, 5), (8, 9), (7, 10)]
+GAME2 = [(7, 7), (6, 6), (8, 6), (6, 8), (6, 7), (8, 8), (5, 8), (7, 8), (9, 8), (4, 9), (9, 5), (10, 4)]
+
+# (name, moves), player one moves first
+BENCH_POSITIONS = [
+	('opening-1', GAME[:3]),
+	('opening-2', GAME[:5]),
+	('opening-3', GAME2[:4]),
+	('middle-1', GAME[:11]),
+	('middle-2', GAME[:15]),
+	('middle-3', GAME[:19]),
+	('middle-4', GAME2[:10]),
+	('tactical-1', GAME[:23]),
+	('tactical-2', GAME[:27]),
+	('tactical-3', GAME2[:12]),
+]
+
+def createBoard(chess_len, moves):
+	board = Board(chess_len, chess_len)
+	turn = MAP_ENTRY_TYPE.MAP_PLAYER_ONE
+	for (x, y) in moves:
+		board.click(x, y, turn)
+		turn = board.reverseTurn(turn)
+	return board, turn
+
+def getRate(num, total):
+	return num / total if total > 0 else 0
+
+# search a position to depth with a new AI
+def benchPosition(moves, depth, chess_len=CHESS_LEN):
+	board, turn = createBoard(chess_len, moves)
+	# openings are searched to AI_OPENING_DEPTH, it must be the depth too
+	old_depth, old_opening_depth = ChessAI.AI_SEARCH_DEPTH, ChessAI.AI_OPENING_DEPTH
+	ChessAI.AI_SEARCH_DEPTH = ChessAI.AI_OPENING_DEPTH = depth
+	ai = ChessAI.ChessAI(chess_len)
+	ai.number = len(moves)
+	time1 = time.time()
+	x, y = ai.findBestChess(board.map, turn)
+	used = time.time() - time1
+	ChessAI.AI_SEARCH_DEPTH, ChessAI.AI_OPENING_DEPTH = old_depth, old_opening_depth
+	return {'depth': depth, 'search_depth': ai.search_depth, 'move': [x, y], 'score': ai.best_score,
+			'time': used, 'nodes': ai.nodes, 'alpha': ai.alpha, 'belta': ai.belta,
+			'cache_probe': ai.cacheProbe, 'cache_get': ai.cacheGet, 'cache_hit_rate': getRate(ai.cacheGet, ai.cacheProbe),
+			'save_count': ai.save_count}
+
+def runBench(depths=BENCH_DEPTHS):
+	ChessAI.DEBUG_LEVEL = ChessAI.DEBUG_NONE
+	ChessAI.AI_ZOBRIST_SEED = BENCH_SEED
+	positions = []
+	for name, moves in BENCH_POSITIONS:
+		results = [benchPosition(moves, depth) for depth in depths]
+		# move is stable if deeper search doesn't change it
+		stable = all([result['move'] == results[-1]['move'] for result in results])
+		positions.append({'name': name, 'results': results, 'stable': stable})
+
+	nodes = sum([result['nodes'] for position in positions for result in position['results']])
+	used = sum([result['time'] for position in positions for result in position['results']])
+	total = {'nodes': nodes, 'time': used, 'nps': nodes / used,
+			'stable': sum([position['stable'] for position in positions]), 'positions': len(positions)}
+	for depth in depths:
+		results = [result for position in positions for result in position['results'] if result['depth'] == depth]
+		total['time_depth_%d' % depth] = sum([result['time'] for result in results])
+		total['cache_get_depth_%d' % depth] = sum([result['cache_get'] for result in results])
+		total['cache_hit_rate_depth_%d' % depth] = getRate(total['cache_get_depth_%d' % depth], sum([result['cache_probe'] for result in results]))
+		total['save_count_depth_%d' % depth] = sum([result['save_count'] for result in results])
+	return {'seed': BENCH_SEED, 'depths': depths, 'total': total, 'positions': positions}
+
+# return error messages of the regression check, empty if passed
+def checkBaseline(report, baseline, threshold):
+	errors = []
+	nps, base_nps = report['total']['nps'], baseline['total']['nps']
+	if nps < base_nps * (1 - threshold):
+		errors.append('nodes per second %.0f is lower than baseline %.0f by more than %d%%' % (nps, base_nps, threshold * 100))
+	base_moves = {position['name']: position['results'] for position in baseline['positions']}
+	for position in report['positions']:
+		for result, base in zip(position['results'], base_moves.get(position['name'], [])):
+			if result['move'] != base['move']:
+				print('%s depth %d: move %s, baseline %s' % (position['name'], result['depth'], result['move'], base['move']), file=sys.stderr)
+	return errors
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='search benchmark over a fixed set of positions')
+	parser.add_argument('--depths', type=int, nargs='+', default=BENCH_DEPTHS)
+	parser.add_argument('--output', help='write JSON result to this file instead of stdout')
+	parser.add_argument('--baseline', help='JSON result of an earlier run to compare with')
+	parser.add_argument('--threshold', type=float, default=BENCH_THRESHOLD)
+	args = parser.parse_args()
+
+	report = runBench(args.depths)
+	if args.output:
+		with open(args.output, 'w') as f:
+			json.dump(report, f, indent=1)
+	else:
+		print(json.dumps(report, indent=1))
+
+	if args.baseline:
+		with open(args.baseline) as f:
+			baseline = json.load(f)
+		errors = checkBaseline(report, baseline, args.threshold)
+		for error in errors:
+			print(error, file=sys.stderr)
+		if len(errors) > 0:
+			sys.exit(1)
@@ -0,0 +1,122 @@
+
+# bit value of the 9 positions in a line, used to get the index of a line in LINE_TABLE
+TERNARY = [sum([3**i for i in range(9) if (bits >> i) & 1]) for bits in range(512)]
+
+# position of the board in the bit layout of the four directions [horizon, vertical, left diagonal, right diagonal],
+# chesses of a line are continuous bits and every line is separated by 4 border bits,
+# so a line of fixed len 9: XXXXMXXXX can be got by one shift of the mask
+class BitTable():
+	def __init__(self, chess_len):
+		self.len = chess_len
+		dir_offset = [(1, 0), (0, 1), (1, 1), (1, -1)] # direction from left to right
+		self.bit = [[[0,0,0,0] for x in range(chess_len)] for y in range(chess_len)]
+		self.border = [0, 0, 0, 0]
+		for dir_index in range(4):
+			offset = 0
+			for (x, y) in self.getLineStarts(dir_offset[dir_index]):
+				self.border[dir_index] |= 0xf << offset
+				offset += 4
+				while x >= 0 and x < chess_len and y >= 0 and y < chess_len:
+					self.bit[y][x][dir_index] = offset
+					offset += 1
+					x += dir_offset[dir_index][0]
+					y += dir_offset[dir_index][1]
+			self.border[dir_index] |= 0xf << offset
+		self.neighbor = {}
+
+	# get the first position of every line in direction
+	def getLineStarts(self, dir_offset):
+		starts = []
+		for y in range(self.len):
+			for x in range(self.len):
+				pre_x, pre_y = x - dir_offset[0], y - dir_offset[1]
+				if (pre_x < 0 or pre_x >= self.len or
+					pre_y < 0 or pre_y >= self.len):
+					starts.append((x, y))
+		return starts
+
+	# masks of the positions in radius range, in horizon bit layout
+	def getNeighbor(self, radius):
+		if radius not in self.neighbor:
+			masks = [[0 for x in range(self.len)] for y in range(self.len)]
+			for y in range(self.len):
+				for x in range(self.len):
+					for i in range(max(0, y - radius), min(self.len, y + radius + 1)):
+						for j in range(max(0, x - radius), min(self.len, x + radius + 1)):
+							masks[y][x] |= 1 << self.bit[i][j][0]
+			self.neighbor[radius] = masks
+		return self.neighbor[radius]
+
+BIT_TABLES = {}
+
+def getBitTable(chess_len):
+	if chess_len not in BIT_TABLES:
+		BIT_TABLES[chess_len] = BitTable(chess_len)
+	return BIT_TABLES[chess_len]
+
+# line of fixed len 9 for each ternary index, LINE_TABLE[mine-1][index]
+def createLineTable(mine, opponent):
+	lines = []
+	for index in range(3**9):
+		line = []
+		for i in range(9):
+			value = (index // 3**i) % 3
+			if value == 1:
+				line.append(mine)
+			elif value == 2:
+				line.append(opponent)
+			else:
+				line.append(0)
+		lines.append(tuple(line))
+	return lines
+
+LINE_TABLE = [createLineTable(1, 2), createLineTable(2, 1)]
+
+# each player's chesses are stored as a python int mask for each direction,
+# the board is also a list of rows, so reading a position is as fast as the list board
+class BitBoard(list):
+	def __init__(self, chess_len, board=None):
+		super().__init__([[0 for x in range(chess_len)] for y in range(chess_len)])
+		self.len = chess_len
+		self.table = getBitTable(chess_len)
+		self.masks = [[0, 0, 0, 0], [0, 0, 0, 0]]
+		if board is not None:
+			for y in range(chess_len):
+				for x in range(chess_len):
+					if board[y][x] != 0:
+						self.put(x, y, board[y][x])
+
+	def put(self, x, y, value):
+		bit = self.table.bit[y][x]
+		old = self[y][x]
+		if old != 0:
+			masks = self.masks[old-1]
+			for i in range(4):
+				masks[i] &= ~(1 << bit[i])
+		if value != 0:
+			masks = self.masks[value-1]
+			for i in range(4):
+				masks[i] |= 1 << bit[i]
+		self[y][x] = value
+
+	# same as ChessAI.getLineIndex, out of range positions are opponent chess
+	def getLineIndex(self, x, y, dir_index, mine, opponent):
+		shift = self.table.bit[y][x][dir_index] - 4
+		mine_bits = (self.masks[mine-1][dir_index] >> shift) & 0x1ff
+		opponent_bits = ((self.masks[opponent-1][dir_index] | self.table.border[dir_index]) >> shift) & 0x1ff
+		return TERNARY[mine_bits] + 2 * TERNARY[opponent_bits]
+
+	# same as ChessAI.getLine
+	def getLine(self, x, y, dir_index, mine, opponent):
+		return LINE_TABLE[mine-1][self.getLineIndex(x, y, dir_index, mine, opponent)]
+
+	def hasNeighbor(self, x, y, radius):
+		mask = self.table.getNeighbor(radius)[y][x]
+		return ((self.masks[0][0] | self.masks[1][0]) & mask) != 0
+
+	# check if player has five or more continuous chesses in any direction
+	def hasFive(self, player):
+		for mask in self.masks[player-1]:
+			if mask & (mask >> 1) & (mask >> 2) & (mask >> 3) & (mask >> 4):
+				return True
+		return False
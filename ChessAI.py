@@ -1,11 +1,38 @@
-from GameMap import *
+from GameBoard import *
+from BitBoard import *
+from FlatBoard import *
+from ChessType import *
+from ThreatSolver import *
+from OpeningBook import *
+from PersistentCache import *
 from enum import IntEnum
-from random import randint
+from random import Random
 import copy
+from bisect import insort
 import time
 
 AI_SEARCH_DEPTH = 4
+AI_OPENING_DEPTH = 4 # search depth when there are no more than 6 chesses
+AI_USE_PVS = True # search moves after the first with null window, search again if it fails high
+AI_ASPIRATION_WINDOW = 50 # window around score of last iteration, 0 means full window
+AI_OPENING_BOOK = None # path of opening book file built by OpeningBook.py, None to search every move
 AI_LIMITED_MOVE_NUM = 20
+AI_USE_BITBOARD = False
+AI_PARALLEL_WORKERS = 0 # number of processes to search root moves, 0 means search in game process
+AI_NEIGHBOR_RADIUS = 1 # only empty positions in this range of a chess are searched
+AI_CACHE_SIZE = 1 << 17 # entry number of transposition table, must be a power of 2
+# search budget of one move, 0 means no limit. when it runs out, the best move searched is used
+AI_TIME_LIMIT = 0 # seconds
+AI_NODE_LIMIT = 0
+AI_SEARCH_STATS = False # collect SearchStats of every search
+# sqlite file path of search results kept between games, None to disable.
+# results of searches to at least AI_PERSIST_MIN_DEPTH are saved, read only mode never writes the file
+AI_PERSIST_CACHE = None
+AI_PERSIST_SIZE = 100000
+AI_PERSIST_MIN_DEPTH = 4
+AI_PERSIST_READONLY = False
+AI_SYMMETRY_HASH = False # symmetric positions share cache entries, costs 8 codes update for every move
+AI_ZOBRIST_SEED = None # fixed seed makes zobrist codes and cache behavior the same in every run
 
 # play mode
 USER_VS_USER_MODE = 0
@@ -32,74 +59,316 @@ def DEBUG(LEVEL, *args):
 			print(args[Index])
 
 
-class CHESS_TYPE(IntEnum):
-	NONE = 0,
-	SLEEP_TWO = 1,
-	LIVE_TWO = 2,
-	SLEEP_THREE = 3
-	LIVE_THREE = 4,
-	CHONG_FOUR = 5,
-	LIVE_FOUR = 6,
-	LIVE_FIVE = 7,
-	
-CHESS_TYPE_NUM = 8
-
-FIVE = CHESS_TYPE.LIVE_FIVE.value
-FOUR, THREE, TWO = CHESS_TYPE.LIVE_FOUR.value, CHESS_TYPE.LIVE_THREE.value, CHESS_TYPE.LIVE_TWO.value
-SFOUR, STHREE, STWO = CHESS_TYPE.CHONG_FOUR.value, CHESS_TYPE.SLEEP_THREE.value, CHESS_TYPE.SLEEP_TWO.value
+# type of score saved in cache
+class CACHE_FLAG(IntEnum):
+	EXACT = 0,
+	LOWER = 1, # score >= beta, the real score may be higher
+	UPPER = 2, # score <= alpha, the real score may be lower
 
-SCORE_MAX = 0x7fffffff
-SCORE_MIN = -1 * SCORE_MAX
-SCORE_FIVE, SCORE_FOUR, SCORE_SFOUR = 100000, 10000, 1000
-SCORE_THREE, SCORE_STHREE, SCORE_TWO, SCORE_STWO = 100, 10, 8, 2
+# index of cache entry tuple
+CACHE_CODE, CACHE_DEPTH, CACHE_SCORE, CACHE_FLAG_INDEX, CACHE_MOVE, CACHE_AGE = 0, 1, 2, 3, 4, 5
 
 class ZobristHash():
-	def __init__(self, chess_len):
-		self.max = 2**32
-		self.player1 = [[self.getRandom() for x in range(chess_len)] for y in range(chess_len)]
-		self.player2 = [[self.getRandom() for x in range(chess_len)] for y in range(chess_len)]
-		self.data = [self.player1, self.player2]
-		self.code = self.getRandom()
-		self.cache = {}
+	def __init__(self, chess_len, size=AI_CACHE_SIZE, symmetry=AI_SYMMETRY_HASH):
+		self.len = chess_len
+		self.max = 2**64 - 1
+		self.random = Random(AI_ZOBRIST_SEED)
+		self.base = self.getRandom()
+		# random numbers of each player's positions are mixed from salt and the position when it is first used,
+		# so a large board only keeps numbers of the positions near chesses, and they don't depend on the order of use
+		self.salt = self.getRandom()
+		self.data = [{}, {}]
+		self.code = self.base
+		# codes of the board after each symmetry, cache uses the smallest one as key
+		# and saves the move in the coordinate of that symmetry
+		self.symmetry = symmetry
+		if symmetry:
+			self.codes = [self.base for i in range(SYMMETRY_NUM)]
+			self.symmetry_data = [{}, {}]
+		# a bucket has two entries, first is depth preferred, second is always replaced
+		self.size = size
+		self.mask = size // 2 - 1
+		self.age = 0
+		self.resetCache()
 
 	def getRandom(self):
-		return randint(1, self.max)
+		return self.random.randint(1, self.max)
+
+	# splitmix64 of the position number
+	def getData(self, index, x, y):
+		data = self.data[index].get((x, y))
+		if data is None:
+			data = (self.salt + ((index * self.len + y) * self.len + x + 1) * 0x9e3779b97f4a7c15) & self.max
+			data = ((data ^ (data >> 30)) * 0xbf58476d1ce4e5b9) & self.max
+			data = ((data ^ (data >> 27)) * 0x94d049bb133111eb) & self.max
+			data = (data ^ (data >> 31)) or 1
+			self.data[index][(x, y)] = data
+		return data
 	
+	# random numbers of the position after each symmetry
+	def getSymmetryData(self, index, x, y):
+		data = self.symmetry_data[index].get((x, y))
+		if data is None:
+			points = [getSymmetryPoint(i, x, y, self.len) for i in range(SYMMETRY_NUM)]
+			data = self.symmetry_data[index][(x, y)] = [self.getData(index, tmp_x, tmp_y) for (tmp_x, tmp_y) in points]
+		return data
+
 	def generate(self, index, x, y):
-		self.code = self.code ^ self.data[index][y][x]
+		self.code = self.code ^ self.getData(index, x, y)
+		if self.symmetry:
+			codes, data = self.codes, self.getSymmetryData(index, x, y)
+			for i in range(SYMMETRY_NUM):
+				codes[i] ^= data[i]
+
+	# return (cache key, symmetry index)
+	def getKey(self):
+		if not self.symmetry:
+			return self.code, 0
+		key = min(self.codes)
+		return key, self.codes.index(key)
 	
+	# calculate code of board, the board may be changed without calling generate
+	def initCode(self, board):
+		self.code = self.base
+		if self.symmetry:
+			self.codes = [self.base for i in range(SYMMETRY_NUM)]
+		for (x, y) in getStones(board):
+			self.generate(board[y][x] - 1, x, y)
+
 	def resetCache(self):
-		self.cache = {}
+		self.cache = [None for i in range(self.size)]
 
-	def getCache(self):	
-		if self.code in self.cache:
-			return self.cache[self.code]
-		else:
-			return None
+	# entries saved in old searches can still be used, but will be replaced first
+	def newSearch(self):
+		self.age += 1
+
+	def getCache(self):
+		code, symmetry = self.getKey()
+		index = (code & self.mask) * 2
+		entry = self.cache[index]
+		if entry is None or entry[CACHE_CODE] != code:
+			entry = self.cache[index + 1]
+			if entry is None or entry[CACHE_CODE] != code:
+				return None
+		if symmetry != 0 and entry[CACHE_MOVE] is not None:
+			x, y = getSymmetryPoint(getInverseSymmetry(symmetry), entry[CACHE_MOVE][0], entry[CACHE_MOVE][1], self.len)
+			entry = entry[:CACHE_MOVE] + ((x, y),) + entry[CACHE_MOVE+1:]
+		return entry
 	
-	def setCache(self, depth, score):
-		DEBUG(DEBUG_INFO, 'code[%d], depth[%d], score[%d]' % (self.code, depth, score))
-		self.cache[self.code] = (depth, score)
+	def setCache(self, depth, score, flag, move):
+		code, symmetry = self.getKey()
+		if DEBUG_LEVEL >= DEBUG_INFO:
+			DEBUG(DEBUG_INFO, 'code[%d], depth[%d], score[%d]' % (code, depth, score))
+		if symmetry != 0 and move is not None:
+			move = getSymmetryPoint(symmetry, move[0], move[1], self.len)
+		index = (code & self.mask) * 2
+		entry = (code, depth, score, flag, move, self.age)
+		old = self.cache[index]
+		if (old is None or old[CACHE_CODE] == code or old[CACHE_AGE] != self.age
+			or depth >= old[CACHE_DEPTH]):
+			self.cache[index] = entry
+		else:
+			self.cache[index + 1] = entry
+
+# statistics of one findBestChess, only collected if stats of ChessAI is enabled
+class SearchStats():
+	def __init__(self):
+		self.move = None
+		self.score = 0
+		self.depth = 0 # depth of the last finished iteration
+		self.time = 0
+		self.nodes = 0
+		self.ply_nodes = [] # nodes searched at each ply of all iterations
+		self.cutoffs = 0 # beta cutoffs
+		self.first_cutoffs = 0 # beta cutoffs by the first searched move
+		self.researches = 0 # null window searches failed high and searched again
+		self.aspiration_fails = 0 # iterations searched again with full window
+		self.tt_probes = 0
+		self.tt_hits = 0 # entry of the same position is found
+		self.tt_cutoffs = 0 # entry score is used without search
+		self.tt_stores = 0
+		self.iterations = [] # (depth, time, nodes) of each iteration
+		self.pv = [] # principal variation from the transposition table
+
+	def addNode(self, ply):
+		while len(self.ply_nodes) <= ply:
+			self.ply_nodes.append(0)
+		self.ply_nodes[ply] += 1
+
+	def getFirstCutoffRate(self):
+		if self.cutoffs == 0:
+			return 0
+		return self.first_cutoffs / self.cutoffs
+
+	def getHitRate(self):
+		if self.tt_probes == 0:
+			return 0
+		return self.tt_hits / self.tt_probes
+
+	# effective branching factor, iterations increase depth by 2
+	def getEBF(self):
+		if len(self.iterations) >= 2:
+			(depth1, time1, nodes1), (depth2, time2, nodes2) = self.iterations[-2:]
+			if nodes1 > 0 and depth2 > depth1:
+				return (nodes2 / nodes1) ** (1 / (depth2 - depth1))
+		if self.depth > 0 and self.nodes > 0:
+			return self.nodes ** (1 / self.depth)
+		return 0
+
+	# add counters of a search of other root moves, used by parallel search
+	def merge(self, other):
+		self.nodes += other.nodes
+		for ply, nodes in enumerate(other.ply_nodes):
+			while len(self.ply_nodes) <= ply:
+				self.ply_nodes.append(0)
+			self.ply_nodes[ply] += nodes
+		self.cutoffs += other.cutoffs
+		self.first_cutoffs += other.first_cutoffs
+		self.researches += other.researches
+		self.aspiration_fails += other.aspiration_fails
+		self.tt_probes += other.tt_probes
+		self.tt_hits += other.tt_hits
+		self.tt_cutoffs += other.tt_cutoffs
+		self.tt_stores += other.tt_stores
+
+	def toDict(self):
+		return {'move': self.move, 'score': self.score, 'depth': self.depth, 'time': self.time,
+			'nodes': self.nodes, 'ply_nodes': self.ply_nodes, 'cutoffs': self.cutoffs,
+			'first_cutoff_rate': self.getFirstCutoffRate(), 'researches': self.researches,
+			'aspiration_fails': self.aspiration_fails, 'tt_probes': self.tt_probes, 'tt_hits': self.tt_hits, 'tt_cutoffs': self.tt_cutoffs, 'tt_stores': self.tt_stores,
+			'ebf': self.getEBF(), 'iterations': self.iterations, 'pv': self.pv}
 
 class ChessAI():
-	def __init__(self, chess_len, cache=True):
+	def __init__(self, chess_len, cache=True, heuristic=True, radius=AI_NEIGHBOR_RADIUS, threat=True, stats=AI_SEARCH_STATS, book=AI_OPENING_BOOK,
+			symmetry=AI_SYMMETRY_HASH, persist=AI_PERSIST_CACHE):
 		self.len = chess_len
-		# [horizon, vertical, left diagonal, right diagonal]
-		self.record = [[[0,0,0,0] for x in range(chess_len)] for y in range(chess_len)]
+		self.center = chess_len // 2
+		# [horizon, vertical, left diagonal, right diagonal] of analysized positions, position (x, y) starts at (y * len + x) * 4.
+		# engine state is kept in dicts of the positions near chesses, so its size and the time of
+		# a new search depend on the chess number, not the board size
+		self.record = {}
 		self.count = [[0 for x in range(CHESS_TYPE_NUM)] for i in range(2)]
-		self.pos_score = [[(7 - max(abs(x - 7), abs(y - 7))) for x in range(chess_len)] for y in range(chess_len)]
 		self.number = 0
 		self.save_count = 0
 		self.cache = cache
+		# cache probes and probes whose score is used without search
+		self.cacheProbe = 0
 		self.cacheGet = 0
 		if self.cache:
-			self.zobrist = ZobristHash(chess_len)
+			self.zobrist = ZobristHash(chess_len, AI_CACHE_SIZE, symmetry=symmetry)
+		# killer moves of each ply and history score of each player's moves, used for move ordering
+		self.heuristic = heuristic
+		self.killer = []
+		self.history = [{}, {}]
+		self.deadline = 0
+		self.node_limit = 0
+		self.nodes = 0
+		self.stop = False
+		# event of another process which stops the search when it is set, used by parallel search workers
+		self.stop_event = None
+		self.search_depth = 0
+		self.best_score = 0
+		# SearchStats of the last findBestChess if enabled, stats_hook is called with it after every search
+		self.stats_enabled = stats
+		self.stats = None
+		self.stats_hook = None
+		self.book = None
+		if book is not None:
+			self.book = OpeningBook(book)
+		self.persist = None
+		if persist is not None:
+			self.persist = PersistentCache(persist, chess_len, AI_PERSIST_SIZE, AI_PERSIST_READONLY)
+		# only search these root moves if not None, used by parallel search
+		self.root_moves = None
+		# best root move of the last finished iteration, it is searched first in the next iteration
+		self.root_best = None
+		self.initLines()
+		self.initNeighbors(radius)
+		self.initPointCache()
+		self.threat = None
+		if threat:
+			self.threat = ThreatSolver(self)
 		
+	# every cell lies on exactly one line of each direction, chesses of a line are kept in board scan order
+	def initLines(self):
+		dir_offset = [(1, 0), (0, 1), (1, 1), (1, -1)] # direction from left to right
+		self.dir_offset = dir_offset
+		# index of a position (x, y) is y * len + x, the index offset of the next position in each direction
+		self.dir_step = [dir[1] * self.len + dir[0] for dir in dir_offset]
+		# sorted position indexes of the chesses of each line which has chesses
+		self.line_stones = [{} for dir_index in range(4)]
+		# chess type count of each line, and the sum of them for the whole board
+		self.line_count = [{} for dir_index in range(4)]
+		self.empty_count = [[0 for x in range(CHESS_TYPE_NUM)] for i in range(2)]
+		self.board_count = [[0 for x in range(CHESS_TYPE_NUM)] for i in range(2)]
+
+	# id of the line through (x, y) in each direction
+	def getLineIds(self, x, y):
+		return (y, x, x - y + self.len - 1, x + y)
+
+	# all positions of a line in board scan order
+	def getLineCells(self, dir_index, line_id):
+		if dir_index == 0:
+			return [(x, line_id) for x in range(self.len)]
+		if dir_index == 1:
+			return [(line_id, y) for y in range(self.len)]
+		if dir_index == 2:
+			diff = line_id - self.len + 1
+			return [(y + diff, y) for y in range(max(0, -diff), min(self.len, self.len - diff))]
+		return [(line_id - y, y) for y in range(max(0, line_id - self.len + 1), min(self.len, line_id + 1))]
+
+	def getLineNum(self, dir_index):
+		return self.len if dir_index < 2 else 2 * self.len - 1
+
+	# positions in radius range of each position are created when first used,
+	# and the number of chesses in range of each position which has chesses in range
+	def initNeighbors(self, radius):
+		self.radius = radius
+		self.neighbors = {}
+		self.neighbor_count = {}
+		# positions which have chesses in range, some of them may be not empty
+		self.candidates = set()
+
+	def getNeighbors(self, x, y):
+		neighbors = self.neighbors.get((x, y))
+		if neighbors is None:
+			radius = self.radius
+			neighbors = self.neighbors[(x, y)] = [(j, i) for i in range(max(0, y - radius), min(self.len, y + radius + 1))
+					for j in range(max(0, x - radius), min(self.len, x + radius + 1))]
+		return neighbors
+
+	def initCandidates(self, stones):
+		self.candidates = set()
+		self.neighbor_count = {}
+		for (x, y) in stones:
+			self.addNeighbor(x, y)
+
+	def addNeighbor(self, x, y):
+		neighbor_count = self.neighbor_count
+		for pos in self.getNeighbors(x, y):
+			count = neighbor_count.get(pos, 0) + 1
+			neighbor_count[pos] = count
+			if count == 1:
+				self.candidates.add(pos)
+
+	def removeNeighbor(self, x, y):
+		neighbor_count = self.neighbor_count
+		for pos in self.getNeighbors(x, y):
+			count = neighbor_count[pos] - 1
+			if count == 0:
+				del neighbor_count[pos]
+				self.candidates.discard(pos)
+			else:
+				neighbor_count[pos] = count
+
+	# must be called before searching a new board
+	def initBoard(self, board):
+		stones = self.initLineCount(board)
+		self.initCandidates(stones)
+		self.resetPointCache()
+
 	def reset(self):
-		for y in range(self.len):
-			for x in range(self.len):
-				for i in range(4):
-					self.record[y][x][i] = 0
+		self.record = {}
 
 		for i in range(len(self.count)):
 			for j in range(len(self.count[0])):
@@ -107,26 +376,123 @@ class ChessAI():
 		
 		self.save_count = 0
 	
+	# analysis all lines with chesses, must be called before using board_count of a new board.
+	# return the positions of chesses
+	def initLineCount(self, board):
+		self.reset()
+		for i in range(len(self.board_count)):
+			for j in range(len(self.board_count[0])):
+				self.board_count[i][j] = 0
+
+		stones = getStones(board)
+		self.line_stones = [{} for dir_index in range(4)]
+		self.line_count = [{} for dir_index in range(4)]
+		for (x, y) in stones:
+			ids = self.getLineIds(x, y)
+			for dir_index in range(4):
+				self.line_stones[dir_index].setdefault(ids[dir_index], []).append(y * self.len + x)
+
+		for dir_index in range(4):
+			for line_id in self.line_stones[dir_index]:
+				count = self.evaluateLine(board, dir_index, line_id)
+				self.line_count[dir_index][line_id] = count
+				for i in range(2):
+					for j in range(CHESS_TYPE_NUM):
+						self.board_count[i][j] += count[i][j]
+		return stones
+
+	# reanalysis the four lines through (x, y) after it is changed
+	def updateLineCount(self, board, x, y):
+		ids = self.getLineIds(x, y)
+		index = y * self.len + x
+		for dir_index in range(4):
+			line_id = ids[dir_index]
+			line_stones = self.line_stones[dir_index]
+			if board[y][x] != 0:
+				stones = line_stones.get(line_id)
+				if stones is None:
+					line_stones[line_id] = [index]
+				else:
+					insort(stones, index)
+			else:
+				stones = line_stones[line_id]
+				stones.remove(index)
+				if len(stones) == 0:
+					del line_stones[line_id]
+			old_count = self.line_count[dir_index].get(line_id, self.empty_count)
+			count = self.evaluateLine(board, dir_index, line_id)
+			self.line_count[dir_index][line_id] = count
+			for i in range(2):
+				for j in range(CHESS_TYPE_NUM):
+					if count[i][j] != old_count[i][j]:
+						self.board_count[i][j] += count[i][j] - old_count[i][j]
+
+	# get chess type count of one line, stones are analysized in board scan order
+	def evaluateLine(self, board, dir_index, line_id):
+		stones = self.line_stones[dir_index].get(line_id)
+		if stones is None:
+			return self.empty_count
+		dir = self.dir_offset[dir_index]
+		count = [[0 for x in range(CHESS_TYPE_NUM)] for i in range(2)]
+		record = self.record
+		for index in stones:
+			record[index * 4 + dir_index] = 0
+
+		for index in stones:
+			if record[index * 4 + dir_index] == 0:
+				y, x = divmod(index, self.len)
+				turn = board[y][x]
+				self.analysisLine2(board, x, y, dir_index, dir, turn, 3 - turn, count[turn-1])
+			else:
+				self.save_count += 1
+		return count
+
 	def click(self, map, x, y, turn):
 		self.number += 1
 		map.click(x, y, turn)
 		if self.cache:
 			self.zobrist.generate(turn.value - 1, x, y)
 
+	# the AI searches on its own board, list board is converted at the beginning of findBestChess and isWin
+	def toBoard(self, board):
+		if isinstance(board, FlatBoard):
+			return board
+		return FlatBoard(self.len, board)
+
+	# change a position of board, all board writes of the search go through it
+	def place(self, board, x, y, value):
+		board.put(x, y, value)
+
 	def set(self, board, x, y, turn):
 		self.number += 1
-		board[y][x] = turn.value
+		self.place(board, x, y, turn.value)
+		self.updateLineCount(board, x, y)
+		self.clearPointCache(x, y)
+		self.addNeighbor(x, y)
 		if self.cache:
 			self.zobrist.generate(turn.value - 1, x, y)
 	
 	def remove(self, board, x, y, turn):
 		self.number -= 1
-		board[y][x] = 0
+		self.place(board, x, y, 0)
+		self.updateLineCount(board, x, y)
+		self.restorePointCache()
+		self.removeNeighbor(x, y)
 		if self.cache:
 			self.zobrist.generate(turn.value - 1, x, y)
 		
+	# check the whole board, use getFive of GameBoard if the last chess is known
 	def isWin(self, board, turn):
+		board = self.toBoard(board)
+		self.initLineCount(board)
 		return self.__evaluate(board, turn, True)
+
+	# check if putting a chess of turn at the empty position makes five, only the four lines through it are scanned
+	def isFive(self, board, x, y, turn):
+		self.place(board, x, y, turn.value)
+		five = getFive(board, x, y)
+		self.place(board, x, y, 0)
+		return five is not None
 	
 	# get all positions that is empty
 	def genmove(self, board, turn):
@@ -134,7 +500,7 @@ class ChessAI():
 		for y in range(self.len):
 			for x in range(self.len):
 				if board[y][x] == 0:
-					score = self.pos_score[y][x]
+					score = self.center - max(abs(x - self.center), abs(y - self.center))
 					moves.append((score, x, y))
 
 		moves.sort(reverse=True)
@@ -142,36 +508,72 @@ class ChessAI():
 	
 	# evaluate score of point, to improve pruning efficiency
 	def evaluatePointScore(self, board, x, y, mine, opponent):
-		dir_offset = [(1, 0), (0, 1), (1, 1), (1, -1)] # direction from left to right
-		for i in range(len(self.count)):
-			for j in range(len(self.count[0])):
-				self.count[i][j] = 0
-				
-		board[y][x] = mine
-		self.evaluatePoint(board, x, y, mine, opponent, self.count[mine-1])
-		mine_count = self.count[mine-1]
-		board[y][x] = opponent
-		self.evaluatePoint(board, x, y, opponent, mine, self.count[opponent-1])
-		opponent_count = self.count[opponent-1]
-		board[y][x] = 0
-
-		mscore = self.getPointScore(mine_count)
-		oscore = self.getPointScore(opponent_count)
+		cache = self.point_cache.get((x, y))
+		if cache is None:
+			cache = self.point_cache[(x, y)] = [None, None]
+		if cache[mine-1] is None:
+			cache[mine-1] = self.getPlayerPointScore(board, x, y, mine, opponent)
+		if cache[opponent-1] is None:
+			cache[opponent-1] = self.getPlayerPointScore(board, x, y, opponent, mine)
+
+		mscore = cache[mine-1]
+		oscore = cache[opponent-1]
 		if mscore >= SCORE_FIVE or oscore >= SCORE_FIVE:
 			DEBUG(DEBUG_INFO, '(%d, %d), %d:%d, %d:%d' % (x, y, mine-1, mscore, opponent-1, oscore))
 		return (mscore, oscore)
 
+	# score of mine if putting a chess on the empty position
+	def getPlayerPointScore(self, board, x, y, mine, opponent):
+		count = self.count[mine-1]
+		for i in range(len(count)):
+			count[i] = 0
+
+		self.place(board, x, y, mine)
+		self.evaluatePoint(board, x, y, mine, opponent, count)
+		self.place(board, x, y, 0)
+		return self.getPointScore(count)
+
+	# the score of a position only depends on the four lines of fixed len 9 through it,
+	# so it only changes when a chess in these lines is changed
+	def initPointCache(self):
+		self.point_cache = {}
+		# scores cleared by set, remove restores them because the board is the same as before set
+		self.point_stack = []
+		self.line_neighbors = {}
+
+	def getLineNeighbors(self, x, y):
+		neighbors = self.line_neighbors.get((x, y))
+		if neighbors is None:
+			neighbors = self.line_neighbors[(x, y)] = [(x, y)]
+			for dir_offset in self.dir_offset:
+				for i in range(-4, 5):
+					tmp_x, tmp_y = x + i * dir_offset[0], y + i * dir_offset[1]
+					if (i != 0 and tmp_x >= 0 and tmp_x < self.len and
+						tmp_y >= 0 and tmp_y < self.len):
+						neighbors.append((tmp_x, tmp_y))
+		return neighbors
+
+	def resetPointCache(self):
+		self.point_cache = {}
+		self.point_stack = []
+
+	# a position without cached scores is saved as None, restore removes the scores calculated after set
+	def clearPointCache(self, x, y):
+		point_cache = self.point_cache
+		saved = [(pos, point_cache.pop(pos, None)) for pos in self.getLineNeighbors(x, y)]
+		self.point_stack.append(saved)
+
+	def restorePointCache(self):
+		point_cache = self.point_cache
+		for (pos, cache) in self.point_stack.pop():
+			if cache is None:
+				point_cache.pop(pos, None)
+			else:
+				point_cache[pos] = cache
+
 	# check if has a none empty position in it's radius range
 	def hasNeighbor(self, board, x, y, radius):
-		start_x, end_x = (x - radius), (x + radius)
-		start_y, end_y = (y - radius), (y + radius)
-
-		for i in range(start_y, end_y+1):
-			for j in range(start_x, end_x+1):
-				if i >= 0 and i < self.len and j >= 0 and j < self.len:
-					if board[i][j] != 0:
-						return True
-		return False
+		return board.hasNeighbor(x, y, radius)
 
 	# get all positions near chess
 	def genmove1(self, board, turn, only_threes=False):
@@ -187,36 +589,39 @@ class ChessAI():
 
 		moves = []
 
-		for y in range(self.len):
-			for x in range(self.len):
-				if board[y][x] == 0 and self.hasNeighbor(board, x, y, 1):
-					mscore, oscore = self.evaluatePointScore(board, x, y, mine, opponent)
-					point = (max(mscore, oscore), x, y)
+		for (x, y) in self.candidates:
+			if board[y][x] == 0:
+				mscore, oscore = self.evaluatePointScore(board, x, y, mine, opponent)
+				point = (max(mscore, oscore), x, y)
 
-					if (only_threes and point[0] < SCORE_THREE): continue
+				if (only_threes and point[0] < SCORE_THREE): continue
 
-					if mscore >= SCORE_FIVE or oscore >= SCORE_FIVE:
-						fives.append(point)
-					elif mscore >= SCORE_FOUR:
-						mfours.append(point)
-					elif oscore >= SCORE_FOUR:
-						ofours.append(point)
-					elif mscore >= SCORE_SFOUR:
-						msfours.append(point)
-					elif oscore >= SCORE_SFOUR:
-						osfours.append(point)
+				if mscore >= SCORE_FIVE or oscore >= SCORE_FIVE:
+					fives.append(point)
+				elif mscore >= SCORE_FOUR:
+					mfours.append(point)
+				elif oscore >= SCORE_FOUR:
+					ofours.append(point)
+				elif mscore >= SCORE_SFOUR:
+					msfours.append(point)
+				elif oscore >= SCORE_SFOUR:
+					osfours.append(point)
 
-					moves.append(point)
+				moves.append(point)
 
-		if len(fives) > 0: return fives
+		# candidates are not in order, keep these moves in board order
+		def rowOrder(point):
+			return (point[2], point[1])
 
-		if len(mfours) > 0: return mfours
+		if len(fives) > 0: return sorted(fives, key=rowOrder)
+
+		if len(mfours) > 0: return sorted(mfours, key=rowOrder)
 
 		if len(ofours) > 0:
 			if len(msfours) == 0:
-				return ofours
+				return sorted(ofours, key=rowOrder)
 			else:
-				return ofours + msfours
+				return sorted(ofours, key=rowOrder) + sorted(msfours, key=rowOrder)
 
 		moves.sort(reverse=True)
 		DEBUG(DEBUG_INFO, 'len:', len(moves), '  ', moves)
@@ -228,8 +633,48 @@ class ChessAI():
 			moves = moves[:AI_LIMITED_MOVE_NUM]
 		return moves
 	
+	# check if the search budget runs out, then all searching nodes return at once
+	def isStopped(self):
+		if not self.stop:
+			if self.node_limit and self.nodes >= self.node_limit:
+				self.stop = True
+			elif self.deadline and time.time() >= self.deadline:
+				self.stop = True
+			elif self.stop_event is not None and self.stop_event.is_set():
+				self.stop = True
+		return self.stop
+
 	def __search(self, board, turn, depth, alpha = SCORE_MIN, beta = SCORE_MAX):
-		score = self.evaluate(board, turn, self.maxdepth - depth)
+		self.nodes += 1
+		stats = self.stats
+		if stats is not None:
+			stats.addNode(self.maxdepth - depth)
+		if self.isStopped():
+			return 0
+
+		cache_move = None
+		if self.cache:
+			c = self.zobrist.getCache()
+			self.cacheProbe += 1
+			if stats is not None:
+				stats.tt_probes += 1
+				stats.tt_hits += (c is not None)
+			if c is not None:
+				cache_move = c[CACHE_MOVE]
+				# root must search to get bestmove
+				if c[CACHE_DEPTH] >= depth and depth < self.maxdepth:
+					flag, score = c[CACHE_FLAG_INDEX], c[CACHE_SCORE]
+					if (flag == CACHE_FLAG.EXACT or (flag == CACHE_FLAG.LOWER and score >= beta)
+						or (flag == CACHE_FLAG.UPPER and score <= alpha)):
+						self.cacheGet += 1
+						if stats is not None:
+							stats.tt_cutoffs += 1
+						return score
+
+		score = self.evaluate(board, turn)
+		if depth <= 0 and abs(score) < SCORE_FIVE and self.hasLeafThreat(turn):
+			if self.threat.searchVCF(board, turn.value, AI_VCF_LEAF_DEPTH, AI_THREAT_LEAF_NODE_LIMIT) is not None:
+				score = SCORE_FIVE
 		if depth <= 0 or abs(score) >= SCORE_FIVE: 
 			return score
 
@@ -240,72 +685,276 @@ class ChessAI():
 			only_threes = True
 
 		moves = self.genmove1(board, turn, only_threes)
+		if depth == self.maxdepth and self.root_moves is not None:
+			moves = [move for move in moves if (move[1], move[2]) in self.root_moves]
+		ply = self.maxdepth - depth
+		if self.heuristic:
+			self.sortMoves(moves, turn, ply)
+		# search the best move in cache first, at root the best move of last iteration is searched first
+		# even if its cache entry is replaced, so a stopped iteration has always searched it
+		if depth == self.maxdepth and self.root_best is not None:
+			cache_move = self.root_best
+		if cache_move is not None:
+			for i in range(len(moves)):
+				if (moves[i][1], moves[i][2]) == cache_move:
+					moves.insert(0, moves.pop(i))
+					break
 		bestmove = None
 		self.alpha += len(moves)
-
+		# fail soft: best score may be out of the window, it is a tighter bound than alpha or beta
+		old_alpha = alpha
+		best = SCORE_MIN
+		first = True
 		for dump, x, y in moves:
-			self.set(board, x, y, turn)
-			
-			if turn == MAP_ENTRY_TYPE.MAP_PLAYER_ONE:
-				op_turn = MAP_ENTRY_TYPE.MAP_PLAYER_TWO
+			# a move which makes five ends the game, the position after it is not searched.
+			# only a position with five point score can make five
+			if dump >= SCORE_FIVE and self.isFive(board, x, y, turn):
+				score = SCORE_FIVE
+				first = False
 			else:
-				op_turn = MAP_ENTRY_TYPE.MAP_PLAYER_ONE
+				self.set(board, x, y, turn)
+				
+				if turn == MAP_ENTRY_TYPE.MAP_PLAYER_ONE:
+					op_turn = MAP_ENTRY_TYPE.MAP_PLAYER_TWO
+				else:
+					op_turn = MAP_ENTRY_TYPE.MAP_PLAYER_ONE
 
-			score = - self.__search(board, op_turn, depth - 1, -beta, -alpha)
+				if first or not AI_USE_PVS:
+					score = - self.__search(board, op_turn, depth - 1, -beta, -alpha)
+					first = False
+				else:
+					# only prove the move is not better than alpha
+					score = - self.__search(board, op_turn, depth - 1, -alpha - 1, -alpha)
+					if score > alpha and score < beta and not self.stop:
+						if stats is not None:
+							stats.researches += 1
+						score = - self.__search(board, op_turn, depth - 1, -beta, -score)
 
-			self.remove(board, x, y, turn)
+				self.remove(board, x, y, turn)
 			self.belta += 1
+			# score of a stopped search is not reliable
+			if self.stop:
+				break
 
 			# alpha/beta pruning
+			if score > best:
+				best = score
 			if score > alpha:
 				alpha = score
 				bestmove = (x, y)
 				if alpha >= beta:
+					if self.heuristic:
+						self.updateHeuristic(turn, ply, depth, x, y)
+					if stats is not None:
+						stats.cutoffs += 1
+						stats.first_cutoffs += ((x, y) == (moves[0][1], moves[0][2]))
 					break
 
 		if depth == self.maxdepth and bestmove:
 			self.bestmove = bestmove
 		
-		if self.cache and bestmove and abs(alpha) <= SCORE_FIVE:
-			self.zobrist.setCache(self.maxdepth - depth, alpha)
+		if len(moves) == 0:
+			best = alpha
+		if self.cache and not self.stop and abs(best) <= SCORE_FIVE:
+			if best >= beta:
+				flag = CACHE_FLAG.LOWER
+			elif best <= old_alpha:
+				flag = CACHE_FLAG.UPPER
+			else:
+				flag = CACHE_FLAG.EXACT
+			self.zobrist.setCache(depth, best, flag, bestmove)
+			if stats is not None:
+				stats.tt_stores += 1
 				
-		return alpha
+		return best
+
+	# killer moves first, then moves with higher history score, the order of genmove1 is kept for the same score
+	def sortMoves(self, moves, turn, ply):
+		while len(self.killer) <= ply:
+			self.killer.append([None, None])
+		killer = self.killer[ply]
+		history = self.history[turn.value - 1]
+		def getKey(move):
+			pos = (move[1], move[2])
+			if pos == killer[0]:
+				return (2, 0)
+			if pos == killer[1]:
+				return (1, 0)
+			return (0, history.get(pos, 0))
+		moves.sort(key=getKey, reverse=True)
+
+	# the move caused a beta cutoff
+	def updateHeuristic(self, turn, ply, depth, x, y):
+		killer = self.killer[ply]
+		if killer[0] != (x, y):
+			killer[1] = killer[0]
+			killer[0] = (x, y)
+		history = self.history[turn.value - 1]
+		history[(x, y)] = history.get((x, y), 0) + depth * depth
+
+	# killer moves are only useful in the same position, history of older moves is less important
+	def resetHeuristic(self):
+		self.killer = []
+		for i in range(len(self.history)):
+			self.history[i] = {pos: score // 2 for pos, score in self.history[i].items() if score > 1}
+
+	# only search continuous fours at leaf if there is a live three or a four to start with
+	def hasLeafThreat(self, turn):
+		if self.threat is None:
+			return False
+		count = self.board_count[turn.value - 1]
+		return count[THREE] + count[SFOUR] > 0
+
+	# find a forced win before alpha beta search
+	def searchThreat(self, board, turn):
+		if self.threat is None or self.root_moves is not None:
+			return None
+		move = self.threat.searchVCF(board, turn.value)
+		if move is None:
+			move = self.threat.searchVCT(board, turn.value)
+		if move is not None:
+			DEBUG(DEBUG_WARN, 'threat win (%d, %d) nodes[%d]' % (move[0], move[1], self.threat.nodes))
+		return move
+
+	# book move of known position, (x, y, depth, score) or None
+	def searchBook(self, board):
+		if self.book is None or self.root_moves is not None:
+			return None
+		move = self.book.lookup(board, self.number)
+		if move is not None:
+			DEBUG(DEBUG_WARN, 'book move (%d, %d) depth[%d]' % (move[0], move[1], move[2]))
+		return move
+
+	# saved result of a search at least as deep as depth, (x, y, depth, score) or None
+	def searchPersist(self, board, depth):
+		if self.persist is None or self.root_moves is not None:
+			return None
+		move = self.persist.get(board)
+		if move is None or move[2] < depth:
+			return None
+		DEBUG(DEBUG_WARN, 'persist move (%d, %d) depth[%d]' % (move[0], move[1], move[2]))
+		return move
+
+	def savePersist(self, board, x, y, score):
+		if (self.persist is None or self.root_moves is not None or self.stop
+			or self.search_depth < AI_PERSIST_MIN_DEPTH):
+			return
+		self.persist.set(board, x, y, self.search_depth, score)
+
+	# search with a window around the score of last iteration, search again with full window if the score is out of it
+	def searchWindow(self, board, turn, depth, has_score, score):
+		if has_score and AI_ASPIRATION_WINDOW > 0 and abs(score) < SCORE_FIVE:
+			alpha, beta = score - AI_ASPIRATION_WINDOW, score + AI_ASPIRATION_WINDOW
+			self.bestmove = None
+			score = self.__search(board, turn, depth, alpha, beta)
+			if (score > alpha and score < beta) or self.stop:
+				return score
+			if self.stats is not None:
+				self.stats.aspiration_fails += 1
+		self.bestmove = None
+		return self.__search(board, turn, depth)
 
 	def search(self, board, turn, depth = 4):
+		self.root_best = None
+		move = self.searchBook(board)
+		if move is not None:
+			self.search_depth = move[2]
+			return move[3], move[0], move[1]
+
 		if self.number == 0:
-			return 0, 7, 7
+			return 0, self.center, self.center
 
 		if self.number <= 6:
-			depth = 4
+			depth = AI_OPENING_DEPTH
 
+		move = self.searchPersist(board, depth)
+		if move is not None:
+			self.search_depth = move[2]
+			return move[3], move[0], move[1]
+
+		move = self.searchThreat(board, turn)
+		if move is not None:
+			return SCORE_FIVE, move[0], move[1]
+
+		bestmove, bestscore = None, 0
 		for i in range(2, depth+1, 2):
 			self.maxdepth = i
-			self.bestmove = None
-			self.zobrist.resetCache()
-			score = self.__search(board, turn, i)
+			time1, nodes = time.time(), self.nodes
+			score = self.searchWindow(board, turn, i, bestmove is not None, bestscore)
+			if self.stats is not None:
+				self.stats.iterations.append((i, time.time() - time1, self.nodes - nodes))
+			# the moves searched before stopping are still better than the last iteration's best move,
+			# because the best move is searched first
+			if self.bestmove is not None:
+				bestmove, bestscore = self.bestmove, score
+				self.root_best = bestmove
+			if self.stop:
+				DEBUG(DEBUG_WARN, 'stop at depth[%d] nodes[%d]' % (i, self.nodes))
+				break
+			self.search_depth = i
 			if abs(score) >= SCORE_FIVE:
 				DEBUG(DEBUG_WARN, i, score)
 				break
 
-		x, y = self.bestmove
-		return score, x, y
+		# no move is searched completely, use the move with highest point score
+		if bestmove is None:
+			moves = self.genmove1(board, turn)
+			bestmove = (moves[0][1], moves[0][2])
+
+		x, y = bestmove
+		self.savePersist(board, x, y, bestscore)
+		return bestscore, x, y
 		
-	def findBestChess(self, board, turn):
+	def findBestChess(self, board, turn, time_limit=AI_TIME_LIMIT, node_limit=AI_NODE_LIMIT):
 		time1 = time.time()
+		board = self.toBoard(board)
 		self.alpha = 0
 		self.belta = 0
+		self.nodes = 0
+		self.stop = False
+		self.search_depth = 0
+		self.deadline = time1 + time_limit if time_limit else 0
+		self.node_limit = node_limit
+		self.initBoard(board)
+		if self.cache:
+			self.zobrist.initCode(board)
+			self.zobrist.newSearch()
+		if self.heuristic:
+			self.resetHeuristic()
+		self.stats = SearchStats() if self.stats_enabled else None
 		score, x, y = self.search(board, turn, AI_SEARCH_DEPTH)
+		self.best_score = score
 		time2 = time.time()
-		DEBUG(DEBUG_WARN, 'time[%.2f] %d(%d, %d), score[%d] alpha[%d] belta[%d] save[%d] cache[%d]' % ((time2-time1), self.number, x, y, score, self.alpha, self.belta, self.save_count, self.cacheGet))
+		if self.stats is not None:
+			self.finishStats(board, turn, x, y, time2 - time1)
+		DEBUG(DEBUG_WARN, 'time[%.2f] %d(%d, %d), score[%d] depth[%d] alpha[%d] belta[%d] save[%d] cache[%d]' % ((time2-time1), self.number, x, y, score, self.search_depth, self.alpha, self.belta, self.save_count, self.cacheGet))
 		return (x, y)
 		
-	def evaluate(self, board, turn, depth):
-		if self.cache:
-			c = self.zobrist.getCache()
-			if c is not None and c[0] >= depth:
-				self.cacheGet += 1
-				return c[1]
-				
+	def finishStats(self, board, turn, x, y, used):
+		stats = self.stats
+		stats.move, stats.score, stats.depth = (x, y), self.best_score, self.search_depth
+		stats.time, stats.nodes = used, self.nodes
+		stats.pv = self.getPV(board, turn, x, y)
+		if self.stats_hook is not None:
+			self.stats_hook(stats)
+
+	# follow the best moves saved in cache from the root move
+	def getPV(self, board, turn, x, y):
+		pv = []
+		while board[y][x] == 0 and len(pv) < max(1, self.search_depth):
+			self.set(board, x, y, turn)
+			pv.append((x, y))
+			turn = MAP_ENTRY_TYPE(3 - turn.value)
+			c = self.zobrist.getCache() if self.cache else None
+			if c is None or c[CACHE_MOVE] is None:
+				break
+			x, y = c[CACHE_MOVE]
+		for i in range(len(pv) - 1, -1, -1):
+			turn = MAP_ENTRY_TYPE(3 - turn.value)
+			self.remove(board, pv[i][0], pv[i][1], turn)
+		return pv
+
+	def evaluate(self, board, turn):
 		score = self.__evaluate(board, turn)
 		return score
 	
@@ -393,9 +1042,8 @@ class ChessAI():
 		
 		return (mscore, oscore)
 
+	# board_count is kept up to date by set and remove, so no need to analysis every stone
 	def __evaluate(self, board, turn, checkWin=False):
-		self.reset()
-		
 		if turn == MAP_ENTRY_TYPE.MAP_PLAYER_ONE:
 			mine = 1
 			opponent = 2
@@ -403,15 +1051,9 @@ class ChessAI():
 			mine = 2
 			opponent = 1
 		
-		for y in range(self.len):
-			for x in range(self.len):
-				if board[y][x] == mine:
-					self.evaluatePoint(board, x, y, mine, opponent)
-				elif board[y][x] == opponent:
-					self.evaluatePoint(board, x, y, opponent, mine)
-		
-		mine_count = self.count[mine-1]
-		opponent_count = self.count[opponent-1]
+		# getScore modifies the count, use copies
+		mine_count = self.board_count[mine-1][:]
+		opponent_count = self.board_count[opponent-1][:]
 		if checkWin:
 			DEBUG(DEBUG_INFO, '%d: %s\n%d: %s' % (mine-1, mine_count, opponent-1, opponent_count))
 			return mine_count[FIVE] > 0
@@ -426,31 +1068,34 @@ class ChessAI():
 			count = self.count[mine-1]
 			ignore_record = False
 		for i in range(4):
-			if self.record[y][x][i] == 0 or ignore_record:
-				self.analysisLine1(board, x, y, i, dir_offset[i], mine, opponent, count)
+			if ignore_record or self.record.get((y * self.len + x) * 4 + i, 0) == 0:
+				self.analysisLine2(board, x, y, i, dir_offset[i], mine, opponent, count)
 				#type = self.analysisLine(board, x, y, i, dir_offset[i], mine, opponent)
 				#if type != CHESS_TYPE.NONE:
 				#	self.count[mine-1][type.value] += 1
 			else:
 				self.save_count += 1
 	
-	# line is fixed len 9: XXXXMXXXX
-	def getLine(self, board, x, y, dir_offset, mine, opponent):
-		line = [0 for i in range(9)]
-		
-		tmp_x = x + (-5 * dir_offset[0])
-		tmp_y = y + (-5 * dir_offset[1])
-		for i in range(9):
-			tmp_x += dir_offset[0]
-			tmp_y += dir_offset[1]
-			if (tmp_x < 0 or tmp_x >= self.len or 
-				tmp_y < 0 or tmp_y >= self.len):
-				line[i] = opponent # set out of range as opponent chess
-			else:
-				line[i] = board[tmp_y][tmp_x]
-						
-		return line
+	# line is fixed len 9: XXXXMXXXX, out of range positions are opponent chess
+	def getLine(self, board, x, y, dir_index, mine, opponent):
+		return board.getLine(x, y, dir_index, mine, opponent)
 		
+	# index of line in LINE_PATTERN, position value is 0: empty, 1: mine, 2: opponent or out of range
+	def getLineIndex(self, board, x, y, dir_index, mine, opponent):
+		return board.getLineIndex(x, y, dir_index, mine, opponent)
+
+	# same result as analysisLine1, but get chess types and analysized range from LINE_PATTERN
+	def analysisLine2(self, board, x, y, dir_index, dir, mine, opponent, count):
+		types, records = LINE_PATTERN[board.getLineIndex(x, y, dir_index, mine, opponent)]
+		for type in types:
+			count[type] += 1
+		step = self.dir_step[dir_index] * 4
+		pos = (y * self.len + x) * 4 + dir_index - 4 * step
+		record = self.record
+		for i in records:
+			record[pos + i * step] = 1
+		return CHESS_TYPE.NONE
+
 	def analysisLine1(self, board, x, y, dir_index, dir, mine, opponent, count):
 		# record line range[left, right] as analysized
 		def setRecord(self, x, y, left, right, dir_index, dir_offset):
@@ -459,12 +1104,12 @@ class ChessAI():
 			for i in range(left, right+1):
 				tmp_x += dir_offset[0]
 				tmp_y += dir_offset[1]
-				self.record[tmp_y][tmp_x][dir_index] = 1
+				self.record[(tmp_y * self.len + tmp_x) * 4 + dir_index] = 1
 	
 		empty = MAP_ENTRY_TYPE.MAP_EMPTY.value
 		left_idx, right_idx = 4, 4
 		
-		line = self.getLine(board, x, y, dir, mine, opponent)
+		line = self.getLine(board, x, y, dir_index, mine, opponent)
 
 		while right_idx < 8:
 			if line[right_idx+1] != mine:
@@ -641,7 +1286,7 @@ class ChessAI():
 		for i in range(len):
 			tmp_x = x + i * dir_offset[0]
 			tmp_y = y + i * dir_offset[1]
-			self.record[tmp_y][tmp_x][dir_index] = 1
+			self.record[(tmp_y * self.len + tmp_x) * 4 + dir_index] = 1
 
 	def analysisLine(self, board, x, y, dir_index, dir, mine, opponent):
 		empty = MAP_ENTRY_TYPE.MAP_EMPTY.value
@@ -722,4 +1367,42 @@ class ChessAI():
 			return CHESS_TYPE.SLEEP_TWO
 		
 		return CHESS_TYPE.NONE
-		
\ No newline at end of file
+		
+
+# analysis every line of fixed len 9 with analysisLine1, for each line index save
+# the chess types found and the positions recorded as analysized.
+# the chess at the middle of line is always mine, other lines are None
+def createLinePattern():
+	ai = ChessAI(9, False)
+	board = FlatBoard(9)
+	patterns = [None for i in range(3**9)]
+	for index in range(3**9):
+		if (index // 3**4) % 3 != 1:
+			continue
+		for i in range(9):
+			board.put(i, 4, (index // 3**i) % 3)
+			ai.record[(4 * 9 + i) * 4] = 0
+		count = [0 for i in range(CHESS_TYPE_NUM)]
+		ai.analysisLine1(board, 4, 4, 0, (1, 0), 1, 2, count)
+		types = []
+		for type in range(CHESS_TYPE_NUM):
+			types += [type] * count[type]
+		records = [i for i in range(9) if ai.record.get((4 * 9 + i) * 4) == 1]
+		patterns[index] = (tuple(types), tuple(records))
+	return patterns
+
+LINE_PATTERN = createLinePattern()
+
+# search on BitBoard, list board is converted to BitBoard at the beginning of findBestChess and isWin
+class BitBoardAI(ChessAI):
+	def toBoard(self, board):
+		if isinstance(board, BitBoard):
+			return board
+		return BitBoard(self.len, board)
+
+	def isWin(self, board, turn):
+		bitboard = self.toBoard(board)
+		# no five continuous chesses, no need to analysis lines
+		if not bitboard.hasFive(turn.value):
+			return False
+		return super().isWin(bitboard, turn)
@@ -0,0 +1,73 @@
+from GameBoard import *
+from BitBoard import *
+
+FLAT_BORDER = 5 # a line of fixed len 9 and neighbor range never go out of the padded board
+
+# index in LINE_PATTERN of the 9 position values of a line, FLAT_LINE_INDEX[mine-1][bytes of line].
+# lines are added when they are first seen, the border value MAP_NONE is the same as opponent
+FLAT_LINE_INDEX = [{}, {}]
+
+def getFlatLineIndex(line, mine):
+	index = 0
+	for i in range(8, -1, -1):
+		value = line[i]
+		if value == 0:
+			index = index * 3
+		elif value == mine:
+			index = index * 3 + 1
+		else:
+			index = index * 3 + 2
+	FLAT_LINE_INDEX[mine-1][line] = index
+	return index
+
+# board of one bytearray with a border of MAP_NONE, position (x, y) is at (y + 5) * stride + x + 5,
+# so the positions of a line are at a fixed stride and no range check is needed.
+# only line and neighbor checks use the bytearray. the board is also a list of rows which put keeps
+# the same, single position reads (genmove1, ThreatSolver, getStones, getFive) use board[y][x]:
+# it is faster than computing the index of one position, and the same code works on every board
+class FlatBoard(list):
+	def __init__(self, chess_len, board=None):
+		super().__init__([[0 for x in range(chess_len)] for y in range(chess_len)])
+		self.len = chess_len
+		self.stride = chess_len + 2 * FLAT_BORDER
+		# [horizon, vertical, left diagonal, right diagonal], same as ChessAI.dir_offset
+		self.strides = [1, self.stride, self.stride + 1, 1 - self.stride]
+		self.cells = bytearray([MAP_ENTRY_TYPE.MAP_NONE.value]) * (self.stride * self.stride)
+		for y in range(chess_len):
+			pos = self.getPos(0, y)
+			self.cells[pos:pos + chess_len] = bytes(chess_len)
+		if board is not None:
+			for y in range(chess_len):
+				for x in range(chess_len):
+					if board[y][x] != 0:
+						self.put(x, y, board[y][x])
+
+	def getPos(self, x, y):
+		return (y + FLAT_BORDER) * self.stride + x + FLAT_BORDER
+
+	def put(self, x, y, value):
+		self[y][x] = value
+		self.cells[(y + FLAT_BORDER) * self.stride + x + FLAT_BORDER] = value
+
+	# same as ChessAI.getLineIndex, out of range positions are opponent chess
+	def getLineIndex(self, x, y, dir_index, mine, opponent):
+		stride = self.strides[dir_index]
+		pos = (y + FLAT_BORDER) * self.stride + x + FLAT_BORDER
+		line = bytes(self.cells[pos - 4 * stride:pos + 5 * stride:stride])
+		index = FLAT_LINE_INDEX[mine-1].get(line)
+		if index is None:
+			index = getFlatLineIndex(line, mine)
+		return index
+
+	# same as ChessAI.getLine
+	def getLine(self, x, y, dir_index, mine, opponent):
+		return LINE_TABLE[mine-1][self.getLineIndex(x, y, dir_index, mine, opponent)]
+
+	def hasNeighbor(self, x, y, radius):
+		pos = (y + FLAT_BORDER) * self.stride + x + FLAT_BORDER
+		for i in range(-radius, radius + 1):
+			start = pos + i * self.stride
+			row = self.cells[start - radius:start + radius + 1]
+			if b'\x01' in row or b'\x02' in row:
+				return True
+		return False
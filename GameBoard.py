@@ -0,0 +1,94 @@
+from enum import IntEnum
+
+# board model shared by the game and the AI, it doesn't import pygame,
+# so the AI can run without a display
+
+CHESS_LEN = 15
+
+class MAP_ENTRY_TYPE(IntEnum):
+	MAP_EMPTY = 0,
+	MAP_PLAYER_ONE = 1,
+	MAP_PLAYER_TWO = 2,
+	MAP_NONE = 3, # out of map range
+	
+class Board():
+	def __init__(self, width, height):
+		self.width = width
+		self.height = height
+		self.map = [[0 for x in range(self.width)] for y in range(self.height)]
+		self.steps = []
+	
+	def reset(self):
+		for y in range(self.height):
+			for x in range(self.width):
+				self.map[y][x] = 0
+		self.steps = []
+	
+	def reverseTurn(self, turn):
+		if turn == MAP_ENTRY_TYPE.MAP_PLAYER_ONE:
+			return MAP_ENTRY_TYPE.MAP_PLAYER_TWO
+		else:
+			return MAP_ENTRY_TYPE.MAP_PLAYER_ONE
+
+	def isEmpty(self, x, y):
+		return (self.map[y][x] == 0)
+	
+	def click(self, x, y, type):
+		self.map[y][x] = type.value
+		self.steps.append((x,y))
+
+	# positions of the five chesses made by the chess at (x, y), or None
+	def getFive(self, x, y):
+		return getFive(self.map, x, y)
+
+# the 8 symmetries of the square board: identity, mirrors, transpose and rotations
+SYMMETRY_NUM = 8
+
+def getSymmetryPoint(index, x, y, chess_len):
+	n = chess_len - 1
+	if index >= 4:
+		x, y = y, x
+	if index & 1:
+		x = n - x
+	if index & 2:
+		y = n - y
+	return (x, y)
+
+# symmetry which moves a point of getSymmetryPoint(index, ...) back
+def getInverseSymmetry(index):
+	if index == 5:
+		return 6
+	if index == 6:
+		return 5
+	return index
+
+# positions of chesses in board scan order, rows without chess are skipped
+def getStones(board):
+	stones = []
+	for y in range(len(board)):
+		row = board[y]
+		if any(row):
+			stones.extend([(x, y) for x in range(len(row)) if row[x] != 0])
+	return stones
+
+# a chess wins if it makes five or more continuous chesses of the same player in a line,
+# only the four lines through it are checked, at most 4 positions to each side.
+# return the positions of the continuous chesses in line order, or None
+def getFive(board, x, y):
+	turn = board[y][x]
+	if turn == 0:
+		return None
+	height, width = len(board), len(board[0])
+	for (dir_x, dir_y) in ((1, 0), (0, 1), (1, 1), (1, -1)):
+		positions = [(x, y)]
+		for sign in (-1, 1):
+			tmp_x, tmp_y = x + sign * dir_x, y + sign * dir_y
+			for i in range(4):
+				if (tmp_x < 0 or tmp_x >= width or tmp_y < 0 or tmp_y >= height
+					or board[tmp_y][tmp_x] != turn):
+					break
+				positions.append((tmp_x, tmp_y))
+				tmp_x, tmp_y = tmp_x + sign * dir_x, tmp_y + sign * dir_y
+		if len(positions) >= 5:
+			return sorted(positions)
+	return None
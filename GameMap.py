@@ -1,125 +1,186 @@
-from enum import IntEnum
 import pygame
 from pygame.locals import *
+from GameBoard import *
 
 GAME_VERSION = 'V1.0'
 
 REC_SIZE = 50
-CHESS_RADIUS = REC_SIZE//2 - 2
-CHESS_LEN = 15
-MAP_WIDTH = CHESS_LEN * REC_SIZE
-MAP_HEIGHT = CHESS_LEN * REC_SIZE
+MIN_REC_SIZE = 10
+MAX_MAP_SIZE = 900 # cells of a large board are smaller, so the map fits in this size
 
 INFO_WIDTH = 200
 BUTTON_WIDTH = 140
 BUTTON_HEIGHT = 50
+SHOW_COUNTER = True # show frames per second and CPU use of the game process
+
+MAP_COLOR = (247, 238, 214)
+PLAYER_COLORS = [(255, 251, 240), (88, 87, 86)]
+LAST_MOVE_COLOR = (255, 0, 255)
+FIVE_COLOR = (255, 0, 0)
+
+# SysFont searches system fonts every time, fonts of each size are created once
+FONTS = {}
+
+def getFont(size):
+	if size not in FONTS:
+		FONTS[size] = pygame.font.SysFont(None, size)
+	return FONTS[size]
+
+# cell size of the map of a board
+def getRecSize(width, height):
+	return max(MIN_REC_SIZE, min(REC_SIZE, MAX_MAP_SIZE // max(width, height)))
+
+# the grid is drawn once on a background surface, chesses and their numbers are cached images.
+# only cells changed since the last draw are drawn again, drawDirty returns their rects for display.update
+class Map(Board):
+	def __init__(self, width, height, rec_size=None):
+		super().__init__(width, height)
+		if rec_size is None:
+			rec_size = getRecSize(width, height)
+		self.rec_size = rec_size
+		self.chess_radius = rec_size//2 - 2
+		self.map_width = width * rec_size
+		self.map_height = height * rec_size
+		# positions of the winning chesses, they are highlighted
+		self.five = None
+		# move number of each chess
+		self.numbers = {}
+		self.background = None
+		self.chess_images = None
+		self.number_images = {}
+		self.dirty = set()
+		self.redraw = True
 
-SCREEN_WIDTH = MAP_WIDTH + INFO_WIDTH
-SCREEN_HEIGHT = MAP_HEIGHT
-
-class MAP_ENTRY_TYPE(IntEnum):
-	MAP_EMPTY = 0,
-	MAP_PLAYER_ONE = 1,
-	MAP_PLAYER_TWO = 2,
-	MAP_NONE = 3, # out of map range
-	
-class Map():
-	def __init__(self, width, height):
-		self.width = width
-		self.height = height
-		self.map = [[0 for x in range(self.width)] for y in range(self.height)]
-		self.steps = []
-	
 	def reset(self):
-		for y in range(self.height):
-			for x in range(self.width):
-				self.map[y][x] = 0
-		self.steps = []
-	
-	def reverseTurn(self, turn):
-		if turn == MAP_ENTRY_TYPE.MAP_PLAYER_ONE:
-			return MAP_ENTRY_TYPE.MAP_PLAYER_TWO
-		else:
-			return MAP_ENTRY_TYPE.MAP_PLAYER_ONE
+		super().reset()
+		self.five = None
+		self.numbers = {}
+		self.dirty = set()
+		self.redraw = True
+
+	def click(self, x, y, type):
+		# the frame of last move moves to the new chess
+		if len(self.steps) > 0:
+			self.dirty.add(self.steps[-1])
+		super().click(x, y, type)
+		self.numbers[(x, y)] = len(self.steps)
+		self.dirty.add((x, y))
+
+	def setFive(self, five):
+		self.five = five
+		self.dirty.update(five)
 
 	def getMapUnitRect(self, x, y):
-		map_x = x * REC_SIZE
-		map_y = y * REC_SIZE
-		
-		return (map_x, map_y, REC_SIZE, REC_SIZE)
-	
+		map_x = x * self.rec_size
+		map_y = y * self.rec_size
+
+		return (map_x, map_y, self.rec_size, self.rec_size)
+
 	def MapPosToIndex(self, map_x, map_y):
-		x = map_x // REC_SIZE
-		y = map_y // REC_SIZE		
+		x = map_x // self.rec_size
+		y = map_y // self.rec_size
 		return (x, y)
-	
+
 	def isInMap(self, map_x, map_y):
-		if (map_x <= 0 or map_x >= MAP_WIDTH or 
-			map_y <= 0 or map_y >= MAP_HEIGHT):
+		if (map_x <= 0 or map_x >= self.map_width or
+			map_y <= 0 or map_y >= self.map_height):
 			return False
 		return True
-	
-	def isEmpty(self, x, y):
-		return (self.map[y][x] == 0)
-	
-	def click(self, x, y, type):
-		self.map[y][x] = type.value
-		self.steps.append((x,y))
+
+	# cells covered by a rect of screen are drawn again at the next drawDirty
+	def markRect(self, rect):
+		left, top = max(0, rect[0] // self.rec_size), max(0, rect[1] // self.rec_size)
+		right = min(self.width - 1, (rect[0] + rect[2] - 1) // self.rec_size)
+		bottom = min(self.height - 1, (rect[1] + rect[3] - 1) // self.rec_size)
+		for y in range(top, bottom + 1):
+			for x in range(left, right + 1):
+				self.dirty.add((x, y))
+
+	def getBackground(self):
+		if self.background is None:
+			self.background = pygame.Surface((self.map_width, self.map_height))
+			self.background.fill(MAP_COLOR)
+			self.drawBackground(self.background)
+		return self.background
+
+	# image of a chess of each player, transparent out of the circle
+	def getChessImage(self, turn):
+		if self.chess_images is None:
+			self.chess_images = []
+			for color in PLAYER_COLORS:
+				image = pygame.Surface((self.rec_size, self.rec_size), SRCALPHA)
+				pygame.draw.circle(image, color, (self.rec_size//2, self.rec_size//2), self.chess_radius)
+				self.chess_images.append(image)
+		return self.chess_images[turn-1]
+
+	def getNumberImage(self, number, turn):
+		if (number, turn) not in self.number_images:
+			font = getFont(self.rec_size*2//3)
+			self.number_images[(number, turn)] = font.render(str(number), True, PLAYER_COLORS[2-turn], PLAYER_COLORS[turn-1])
+		return self.number_images[(number, turn)]
+
+	# draw background and chess of a cell, return its rect
+	def drawCell(self, screen, x, y):
+		rect = pygame.Rect(self.getMapUnitRect(x, y))
+		screen.blit(self.getBackground(), rect, rect)
+		turn = self.map[y][x]
+		if turn == 0:
+			return rect
+		screen.blit(self.getChessImage(turn), rect)
+		msg_image = self.getNumberImage(self.numbers.get((x, y), 0), turn)
+		msg_image_rect = msg_image.get_rect()
+		msg_image_rect.center = rect.center
+		screen.blit(msg_image, msg_image_rect)
+		if self.five is not None and (x, y) in self.five:
+			pygame.draw.rect(screen, FIVE_COLOR, rect, 3)
+		elif (x, y) == self.steps[-1]:
+			pygame.draw.rect(screen, LAST_MOVE_COLOR, rect, 1)
+		return rect
 
 	def drawChess(self, screen):
-		player_one = (255, 251, 240)
-		player_two = (88, 87, 86)
-		player_color = [player_one, player_two]
-		
-		font = pygame.font.SysFont(None, REC_SIZE*2//3)
-		for i in range(len(self.steps)):
-			x, y = self.steps[i]
-			map_x, map_y, width, height = self.getMapUnitRect(x, y)
-			pos, radius = (map_x + width//2, map_y + height//2), CHESS_RADIUS
-			turn = self.map[y][x]
-			if turn == 1:
-				op_turn = 2
-			else:
-				op_turn = 1
-			pygame.draw.circle(screen, player_color[turn-1], pos, radius)
-			
-			msg_image = font.render(str(i+1), True, player_color[op_turn-1], player_color[turn-1])
-			msg_image_rect = msg_image.get_rect()
-			msg_image_rect.center = pos
-			screen.blit(msg_image, msg_image_rect)
-			
-		
-		if len(self.steps) > 0:
-			last_pos = self.steps[-1]
-			map_x, map_y, width, height = self.getMapUnitRect(last_pos[0], last_pos[1])
-			purple_color = (255, 0, 255)
-			point_list = [(map_x, map_y), (map_x + width, map_y), 
-					(map_x + width, map_y + height), (map_x, map_y + height)]
-			pygame.draw.lines(screen, purple_color, True, point_list, 1)
-			
+		for (x, y) in self.steps:
+			self.drawCell(screen, x, y)
+
+	# draw changed cells, or the whole map after reset. return the rects drawn
+	def drawDirty(self, screen):
+		if self.redraw:
+			screen.blit(self.getBackground(), (0, 0))
+			self.drawChess(screen)
+			self.redraw = False
+			self.dirty = set()
+			return [pygame.Rect(0, 0, self.map_width, self.map_height)]
+		rects = [self.drawCell(screen, x, y) for (x, y) in self.dirty]
+		self.dirty = set()
+		return rects
+
+	# star points near the corners and at the center
+	def getStarPoints(self):
+		edge = 3 if min(self.width, self.height) >= 13 else 2
+		right, bottom = self.width - 1 - edge, self.height - 1 - edge
+		return [(edge, edge), (right, edge), (edge, bottom), (right, bottom), (self.width//2, self.height//2)]
+
 	def drawBackground(self, screen):
 		color = (0, 0, 0)
+		rec_size = self.rec_size
 		for y in range(self.height):
 			# draw a horizontal line
-			start_pos, end_pos= (REC_SIZE//2, REC_SIZE//2 + REC_SIZE * y), (MAP_WIDTH - REC_SIZE//2, REC_SIZE//2 + REC_SIZE * y)
+			start_pos, end_pos= (rec_size//2, rec_size//2 + rec_size * y), (self.map_width - rec_size//2, rec_size//2 + rec_size * y)
 			if y == (self.height)//2:
 				width = 2
 			else:
 				width = 1
 			pygame.draw.line(screen, color, start_pos, end_pos, width)
-		
+
 		for x in range(self.width):
 			# draw a horizontal line
-			start_pos, end_pos= (REC_SIZE//2 + REC_SIZE * x, REC_SIZE//2), (REC_SIZE//2 + REC_SIZE * x, MAP_HEIGHT - REC_SIZE//2)
+			start_pos, end_pos= (rec_size//2 + rec_size * x, rec_size//2), (rec_size//2 + rec_size * x, self.map_height - rec_size//2)
 			if x == (self.width)//2:
 				width = 2
 			else:
 				width = 1
 			pygame.draw.line(screen, color, start_pos, end_pos, width)
-				
-		
-		rec_size = 8
-		pos = [(3,3), (11,3), (3, 11), (11,11), (7,7)]
-		for (x, y) in pos:
-			pygame.draw.rect(screen, color, (REC_SIZE//2 + x * REC_SIZE - rec_size//2, REC_SIZE//2 + y * REC_SIZE - rec_size//2, rec_size, rec_size))
-		
\ No newline at end of file
+
+
+		point_size = max(4, rec_size * 4 // 25)
+		for (x, y) in self.getStarPoints():
+			pygame.draw.rect(screen, color, (rec_size//2 + x * rec_size - point_size//2, rec_size//2 + y * rec_size - point_size//2, point_size, point_size))
@@ -0,0 +1,237 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from GameBoard import *
+import ChessAI
+import ThreatSolver
+import argparse
+import math
+import random
+import time
+
+# play games between two AI configurations without pygame.
+# a configuration is a dict, lower case keys are arguments of ChessAI or options of the match,
+# upper case keys replace the module constants (AI_SEARCH_DEPTH, AI_LIMITED_MOVE_NUM, SCORE_THREE ...)
+# while the AI of this configuration is created and thinking
+MATCH_ENGINE_ARGS = ('cache', 'heuristic', 'radius', 'threat', 'symmetry')
+MATCH_OPTIONS = ('bitboard', 'time_limit', 'node_limit')
+# arguments of ChessAI whose default value is a module constant, it is bound when ChessAI is defined,
+# so the current value is passed to use the constant of config
+MATCH_DEFAULT_ARGS = {'radius': 'AI_NEIGHBOR_RADIUS', 'stats': 'AI_SEARCH_STATS', 'book': 'AI_OPENING_BOOK',
+		'symmetry': 'AI_SYMMETRY_HASH', 'persist': 'AI_PERSIST_CACHE'}
+MATCH_OPENING_MOVES = 4 # random chesses placed near the center before the AIs play
+MATCH_OPENING_RANGE = 2 # max distance of opening chesses from the center
+
+def parseValue(value):
+	if value in ('True', 'False'):
+		return value == 'True'
+	if value == 'None':
+		return None
+	for type in (int, float):
+		try:
+			return type(value)
+		except ValueError:
+			pass
+	return value
+
+# "AI_SEARCH_DEPTH=2,cache=False" -> {'AI_SEARCH_DEPTH': 2, 'cache': False}.
+# depth is the search depth of every move, it replaces AI_SEARCH_DEPTH and AI_OPENING_DEPTH.
+# unknown keys raise ValueError, a config which is not used would give a match of two same AIs
+def parseConfig(text):
+	config = {}
+	for item in text.split(','):
+		if item.strip() == '':
+			continue
+		key, value = item.split('=')
+		key, value = key.strip(), parseValue(value.strip())
+		if key == 'depth':
+			config['AI_SEARCH_DEPTH'] = config['AI_OPENING_DEPTH'] = value
+			continue
+		if key.isupper():
+			if not any([hasattr(module, key) for module in (ChessAI, ThreatSolver)]):
+				raise ValueError('unknown constant %s' % key)
+		elif key not in MATCH_ENGINE_ARGS and key not in MATCH_OPTIONS:
+			raise ValueError('unknown config key %s' % key)
+		config[key] = value
+	return config
+
+# constants of config must be applied, they are used when the AI is created
+def createAI(chess_len, config):
+	args = {key: getattr(ChessAI, name) for key, name in MATCH_DEFAULT_ARGS.items()}
+	args.update({key: config[key] for key in MATCH_ENGINE_ARGS if key in config})
+	if config.get('bitboard', False):
+		return ChessAI.BitBoardAI(chess_len, **args)
+	return ChessAI.ChessAI(chess_len, **args)
+
+# set module constants of config, return the old values to restore
+def applyConfig(config):
+	old = []
+	for module in (ChessAI, ThreatSolver):
+		for key, value in config.items():
+			if key.isupper() and hasattr(module, key):
+				old.append((module, key, getattr(module, key)))
+				setattr(module, key, value)
+	return old
+
+def restoreConfig(old):
+	for module, key, value in reversed(old):
+		setattr(module, key, value)
+
+# opening moves are different for each seed, the two games of a pair use the same seed
+def createOpening(chess_len, seed, moves=MATCH_OPENING_MOVES):
+	rand = random.Random(seed)
+	center = chess_len // 2
+	opening = []
+	while len(opening) < moves:
+		x = center + rand.randint(-MATCH_OPENING_RANGE, MATCH_OPENING_RANGE)
+		y = center + rand.randint(-MATCH_OPENING_RANGE, MATCH_OPENING_RANGE)
+		if (x, y) not in opening:
+			opening.append((x, y))
+	return opening
+
+def initWorker():
+	ChessAI.DEBUG_LEVEL = ChessAI.DEBUG_NONE
+
+# AI one plays player one if one_first is True. return the score of AI one: 1 win, 0.5 draw, 0 loss,
+# and the total move time and move number of each AI
+def playGame(chess_len, configs, opening, one_first):
+	board = Board(chess_len, chess_len)
+	ais = []
+	for config in configs:
+		old = applyConfig(config)
+		ais.append(createAI(chess_len, config))
+		restoreConfig(old)
+	times, counts = [0, 0], [0, 0]
+	turn = MAP_ENTRY_TYPE.MAP_PLAYER_ONE
+	for (x, y) in opening:
+		board.click(x, y, turn)
+		turn = board.reverseTurn(turn)
+
+	while len(board.steps) < chess_len * chess_len:
+		# index of the AI to move
+		index = 0 if (turn == MAP_ENTRY_TYPE.MAP_PLAYER_ONE) == one_first else 1
+		ai = ais[index]
+		old = applyConfig(configs[index])
+		time1 = time.time()
+		ai.number = len(board.steps)
+		x, y = ai.findBestChess(board.map, turn, configs[index].get('time_limit', ChessAI.AI_TIME_LIMIT),
+				configs[index].get('node_limit', ChessAI.AI_NODE_LIMIT))
+		times[index] += time.time() - time1
+		counts[index] += 1
+		board.click(x, y, turn)
+		win = board.getFive(x, y) is not None
+		restoreConfig(old)
+		if win:
+			return (1 if index == 0 else 0), times, counts
+		turn = board.reverseTurn(turn)
+	return 0.5, times, counts
+
+def getEloScore(elo):
+	return 1 / (1 + 10 ** (-elo / 400))
+
+def getElo(score):
+	score = min(max(score, 1e-6), 1 - 1e-6)
+	return -400 * math.log10(1 / score - 1)
+
+class MatchResult():
+	def __init__(self):
+		self.scores = []
+		self.times = [0, 0]
+		self.counts = [0, 0]
+
+	def add(self, score, times, counts):
+		self.scores.append(score)
+		for i in range(2):
+			self.times[i] += times[i]
+			self.counts[i] += counts[i]
+
+	def getStats(self):
+		num = len(self.scores)
+		mean = sum(self.scores) / num
+		var = sum([(score - mean) ** 2 for score in self.scores]) / num
+		return num, mean, var
+
+	# elo difference of AI one and its 95% confidence interval
+	def getElo(self):
+		num, mean, var = self.getStats()
+		error = 1.96 * math.sqrt(var / num)
+		return getElo(mean), getElo(mean - error), getElo(mean + error)
+
+	# log likelihood ratio of H1: elo = elo1 against H0: elo = elo0. a game is a win, draw or loss, both
+	# hypotheses use the observed draw ratio, so draws cancel out and only wins and losses change the ratio
+	def getLLR(self, elo0, elo1):
+		num = len(self.scores)
+		wins, draws = self.scores.count(1), self.scores.count(0.5)
+		losses = num - wins - draws
+		score0, score1 = getEloScore(elo0), getEloScore(elo1)
+		# the win and loss probability of both hypotheses must be above 0
+		draw = min(draws / num, 0.99 * 2 * min(score0, score1, 1 - score0, 1 - score1))
+		llr = 0
+		if wins > 0:
+			llr += wins * math.log((score1 - draw / 2) / (score0 - draw / 2))
+		if losses > 0:
+			llr += losses * math.log((1 - score1 - draw / 2) / (1 - score0 - draw / 2))
+		return llr
+
+# return 'H1' if AI one is stronger by elo1, 'H0' if not stronger than elo0, None if not sure yet
+def checkSPRT(result, elo0, elo1, alpha, beta):
+	llr = result.getLLR(elo0, elo1)
+	if llr >= math.log((1 - beta) / alpha):
+		return 'H1'
+	if llr <= math.log(beta / (1 - alpha)):
+		return 'H0'
+	return None
+
+# games are played in pairs with the same opening and swapped colours
+def runMatch(configs, games, workers=1, chess_len=CHESS_LEN, seed=0, sprt=None):
+	result = MatchResult()
+	state = None
+	time1 = time.time()
+	with ProcessPoolExecutor(workers, initializer=initWorker) as pool:
+		futures = []
+		for i in range(games):
+			opening = createOpening(chess_len, seed + i // 2)
+			futures.append(pool.submit(playGame, chess_len, configs, opening, i % 2 == 0))
+		for future in as_completed(futures):
+			result.add(*future.result())
+			if sprt is not None and len(result.scores) >= 2:
+				state = checkSPRT(result, *sprt)
+				if state is not None:
+					for tmp in futures:
+						tmp.cancel()
+					break
+	return result, state, time.time() - time1
+
+def showResult(result, state, total_time, sprt):
+	num = len(result.scores)
+	wins = result.scores.count(1)
+	draws = result.scores.count(0.5)
+	elo, elo_low, elo_high = result.getElo()
+	print('games[%d] win[%d] draw[%d] loss[%d] score[%.3f]' % (num, wins, draws, num - wins - draws, sum(result.scores) / num))
+	print('elo[%.1f] 95%%[%.1f, %.1f]' % (elo, elo_low, elo_high))
+	if sprt is not None:
+		print('sprt elo0[%g] elo1[%g] llr[%.2f] result[%s]' % (sprt[0], sprt[1], result.getLLR(sprt[0], sprt[1]), state))
+	print('time[%.2f] games/s[%.3f]' % (total_time, num / total_time))
+	for i in range(2):
+		print('AI %d moves[%d] latency[%.3f]' % (i + 1, result.counts[i], result.times[i] / max(1, result.counts[i])))
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='play games between two AI configurations')
+	parser.add_argument('--one', default='', help='config of AI one, e.g. "AI_SEARCH_DEPTH=4,cache=True"')
+	parser.add_argument('--two', default='', help='config of AI two')
+	parser.add_argument('--games', type=int, default=100)
+	parser.add_argument('--workers', type=int, default=1)
+	parser.add_argument('--seed', type=int, default=0)
+	parser.add_argument('--size', type=int, default=CHESS_LEN, help='number of lines of the board')
+	parser.add_argument('--sprt', type=float, nargs=2, metavar=('ELO0', 'ELO1'), help='stop when SPRT accepts a hypothesis')
+	parser.add_argument('--alpha', type=float, default=0.05)
+	parser.add_argument('--beta', type=float, default=0.05)
+	args = parser.parse_args()
+
+	sprt = None
+	if args.sprt is not None:
+		sprt = (args.sprt[0], args.sprt[1], args.alpha, args.beta)
+	try:
+		configs = [parseConfig(args.one), parseConfig(args.two)]
+	except ValueError as e:
+		parser.error(str(e))
+	result, state, total_time = runMatch(configs, args.games, args.workers, args.size, args.seed, sprt)
+	showResult(result, state, total_time, sprt)
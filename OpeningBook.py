@@ -0,0 +1,185 @@
+from concurrent.futures import ProcessPoolExecutor
+from GameBoard import *
+from random import Random
+import argparse
+import mmap
+import os
+import struct
+
+# opening book file: a header and a hash table of fixed size entries, the entry of a position is found
+# by its key without reading the whole file. the key is the zobrist code of the board after the symmetry
+# which gives the smallest code, so the 8 symmetric positions share one entry
+BOOK_MAGIC = b'GBOOK001'
+BOOK_HEADER = struct.Struct('<8sII') # magic, chess_len, table size (power of 2)
+BOOK_ENTRY = struct.Struct('<QBBBxi') # key, x, y, depth, score. key 0 is an empty entry
+BOOK_SEED = 20200101 # zobrist codes must be the same for every process which uses the book
+BOOK_MAX_PLY = 10 # positions with more chesses are not looked up
+
+class BookHash():
+	def __init__(self, chess_len):
+		self.len = chess_len
+		rand = Random(BOOK_SEED)
+		self.data = [[[rand.randint(1, 2**64 - 1) for x in range(chess_len)] for y in range(chess_len)] for i in range(2)]
+		self.base = rand.randint(1, 2**64 - 1)
+
+	# return (key, symmetry index) of the board, the book move is in the coordinate of this symmetry
+	def getKey(self, board):
+		codes = [self.base for i in range(SYMMETRY_NUM)]
+		for y in range(self.len):
+			for x in range(self.len):
+				if board[y][x] != 0:
+					data = self.data[board[y][x] - 1]
+					for i in range(SYMMETRY_NUM):
+						tmp_x, tmp_y = getSymmetryPoint(i, x, y, self.len)
+						codes[i] ^= data[tmp_y][tmp_x]
+		key = min(codes)
+		return key, codes.index(key)
+
+class OpeningBook():
+	def __init__(self, path):
+		self.file = open(path, 'rb')
+		self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+		magic, self.len, self.size = BOOK_HEADER.unpack_from(self.data, 0)
+		if magic != BOOK_MAGIC:
+			raise ValueError('%s is not an opening book' % path)
+		self.mask = self.size - 1
+		self.hash = BookHash(self.len)
+
+	def close(self):
+		self.data.close()
+		self.file.close()
+
+	# return (key, x, y, depth, score) of key, or None
+	def getEntry(self, key):
+		index = key & self.mask
+		for i in range(self.size):
+			entry = BOOK_ENTRY.unpack_from(self.data, BOOK_HEADER.size + index * BOOK_ENTRY.size)
+			if entry[0] == key:
+				return entry
+			if entry[0] == 0:
+				return None
+			index = (index + 1) & self.mask
+		return None
+
+	# return (x, y, depth, score) of the book move of board, or None
+	def lookup(self, board, number):
+		if number > BOOK_MAX_PLY or len(board) != self.len:
+			return None
+		key, index = self.hash.getKey(board)
+		entry = self.getEntry(key)
+		if entry is None:
+			return None
+		x, y = getSymmetryPoint(getInverseSymmetry(index), entry[1], entry[2], self.len)
+		if board[y][x] != 0:
+			return None
+		return (x, y, entry[3], entry[4])
+
+	def getEntries(self):
+		entries = {}
+		for index in range(self.size):
+			entry = BOOK_ENTRY.unpack_from(self.data, BOOK_HEADER.size + index * BOOK_ENTRY.size)
+			if entry[0] != 0:
+				entries[entry[0]] = entry
+		return entries
+
+def writeBook(path, chess_len, entries):
+	size = 16
+	while size < len(entries) * 2:
+		size *= 2
+	table = [None for i in range(size)]
+	for entry in entries.values():
+		index = entry[0] & (size - 1)
+		while table[index] is not None:
+			index = (index + 1) & (size - 1)
+		table[index] = entry
+	empty = BOOK_ENTRY.pack(0, 0, 0, 0, 0)
+	# readers still use the old file until they open the book again
+	tmp_path = path + '.tmp'
+	with open(tmp_path, 'wb') as f:
+		f.write(BOOK_HEADER.pack(BOOK_MAGIC, chess_len, size))
+		for entry in table:
+			f.write(BOOK_ENTRY.pack(*entry) if entry is not None else empty)
+	os.replace(tmp_path, path)
+
+def readEntries(path):
+	if not os.path.exists(path):
+		return {}
+	book = OpeningBook(path)
+	entries = book.getEntries()
+	book.close()
+	return entries
+
+# (key, x, y, depth, score) of the book move, x and y are in the coordinate of the key's symmetry
+def createEntry(hash, board, x, y, depth, score):
+	key, index = hash.getKey(board)
+	x, y = getSymmetryPoint(index, x, y, hash.len)
+	return (key, x, y, depth, max(-2**31, min(2**31 - 1, score)))
+
+# play a game from a random opening, return the book entries of the searched positions
+def playBookGame(chess_len, depth, plies, seed, known):
+	# ChessAI imports this module to use the book
+	import ChessAI
+	ChessAI.DEBUG_LEVEL = ChessAI.DEBUG_NONE
+	ChessAI.AI_SEARCH_DEPTH = depth
+	ChessAI.AI_OPENING_DEPTH = depth
+	rand = Random(seed)
+	hash = BookHash(chess_len)
+	ai = ChessAI.ChessAI(chess_len)
+	board = Board(chess_len, chess_len)
+	turn = MAP_ENTRY_TYPE.MAP_PLAYER_ONE
+	entries = []
+	# random chesses near the center, the first chess is always at the center
+	center = chess_len // 2
+	opening = [(center, center)]
+	num = rand.randint(1, 3)
+	while len(opening) < num:
+		x, y = center + rand.randint(-2, 2), center + rand.randint(-2, 2)
+		if (x, y) not in opening:
+			opening.append((x, y))
+	for (x, y) in opening:
+		board.click(x, y, turn)
+		turn = board.reverseTurn(turn)
+
+	while len(board.steps) < plies:
+		key, index = hash.getKey(board.map)
+		if key in known and known[key][3] >= depth:
+			# use the book move, it is in the coordinate of symmetry index
+			x, y = getSymmetryPoint(getInverseSymmetry(index), known[key][1], known[key][2], chess_len)
+		else:
+			ai.number = len(board.steps)
+			x, y = ai.findBestChess(board.map, turn)
+			entries.append(createEntry(hash, board.map, x, y, ai.search_depth, ai.best_score))
+			if abs(ai.best_score) >= ChessAI.SCORE_FIVE:
+				break
+		board.click(x, y, turn)
+		turn = board.reverseTurn(turn)
+	return entries
+
+# add positions of self play games to the book, entries of deeper search are kept
+def buildBook(path, games, depth, plies=BOOK_MAX_PLY, workers=1, seed=0, chess_len=CHESS_LEN):
+	entries = readEntries(path)
+	if len(entries) == 0:
+		# the first chess is at the center
+		empty = [[0 for x in range(chess_len)] for y in range(chess_len)]
+		entry = createEntry(BookHash(chess_len), empty, chess_len // 2, chess_len // 2, depth, 0)
+		entries[entry[0]] = entry
+	with ProcessPoolExecutor(workers) as pool:
+		futures = [pool.submit(playBookGame, chess_len, depth, plies, seed + i, entries) for i in range(games)]
+		for future in futures:
+			for entry in future.result():
+				if entry[0] not in entries or entries[entry[0]][3] <= entry[3]:
+					entries[entry[0]] = entry
+	writeBook(path, chess_len, entries)
+	return len(entries)
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='build or extend an opening book by self play')
+	parser.add_argument('book')
+	parser.add_argument('--games', type=int, default=20)
+	parser.add_argument('--depth', type=int, default=6)
+	parser.add_argument('--plies', type=int, default=BOOK_MAX_PLY, help='positions with fewer chesses are added')
+	parser.add_argument('--workers', type=int, default=1)
+	parser.add_argument('--seed', type=int, default=0)
+	args = parser.parse_args()
+	num = buildBook(args.book, args.games, args.depth, args.plies, args.workers, args.seed)
+	print('%s: %d positions' % (args.book, num))
@@ -0,0 +1,139 @@
+from concurrent.futures import ProcessPoolExecutor, wait
+from ChessAI import *
+import multiprocessing
+
+# AI instance of worker process, it is kept between searches so the cache can be reused
+WORKER_AI = None
+
+def initWorker(chess_len, bitboard, stats, stop_event):
+	global WORKER_AI
+	# book and saved results are used by the parent process
+	if bitboard:
+		WORKER_AI = BitBoardAI(chess_len, stats=stats, book=None, persist=None)
+	else:
+		WORKER_AI = ChessAI(chess_len, stats=stats, book=None, persist=None)
+	WORKER_AI.stop_event = stop_event
+
+# search part of the root moves in worker process, return the best one of them.
+# score is None if the budget runs out before any of them is searched, the move is not from the part then
+def searchRootMoves(board, turn, number, moves, time_limit, node_limit):
+	ai = WORKER_AI
+	ai.number = number
+	ai.root_moves = set(moves)
+	x, y = ai.findBestChess(board, turn, time_limit, node_limit)
+	score = ai.best_score if ai.root_best is not None else None
+	return (score, x, y, ai.search_depth, ai.nodes, ai.belta, ai.stats)
+
+# a proven win is the best and a proven loss the worst result whatever its depth, other scores of
+# a deeper search are more reliable. same depth and score, use the move with higher point score
+# as single process search does
+def getResultOrder(result, moves):
+	score, x, y, depth = result[0], result[1], result[2], result[3]
+	if score >= SCORE_FIVE:
+		return (2, 0, score, -moves.index((x, y)))
+	if score <= -SCORE_FIVE:
+		return (0, 0, score, -moves.index((x, y)))
+	return (1, depth, score, -moves.index((x, y)))
+
+# root moves are split among worker processes, each worker searches its moves on its own board copy,
+# the best move of all workers is used
+class ParallelAI(ChessAI):
+	def __init__(self, chess_len, workers, bitboard=False, stats=AI_SEARCH_STATS):
+		super().__init__(chess_len, False, stats=stats)
+		self.workers = workers
+		# set when the search is stopped, running tasks can't be cancelled so workers check it
+		self.worker_stop = multiprocessing.Event()
+		self.pool = ProcessPoolExecutor(workers, initializer=initWorker, initargs=(chess_len, bitboard, stats, self.worker_stop))
+
+	def close(self):
+		self.pool.shutdown()
+
+	def findBestChess(self, board, turn, time_limit=AI_TIME_LIMIT, node_limit=AI_NODE_LIMIT):
+		time1 = time.time()
+		self.stop = False
+		moves = []
+		# workers get the list board, it is smaller to send than the AI's board
+		flat = self.toBoard(board)
+		if self.number > 0:
+			self.initBoard(flat)
+			self.maxdepth = AI_SEARCH_DEPTH
+			moves = [(x, y) for (score, x, y) in self.genmove1(flat, turn)]
+		# nothing to split
+		if len(moves) <= 1 or self.workers <= 1:
+			return super().findBestChess(flat, turn, time_limit, node_limit)
+
+		# book move, saved result and forced win are searched before splitting, workers only search their root moves
+		self.deadline = time1 + time_limit if time_limit else 0
+		self.node_limit = 0
+		self.nodes = 0
+		self.search_depth = 0
+		self.stats = SearchStats() if self.stats_enabled else None
+		move = self.searchBook(flat)
+		if move is not None:
+			self.search_depth, self.best_score = move[2], move[3]
+			return self.finishMove(flat, turn, move[0], move[1], time1)
+		move = self.searchPersist(flat, AI_OPENING_DEPTH if self.number <= 6 else AI_SEARCH_DEPTH)
+		if move is not None:
+			self.search_depth, self.best_score = move[2], move[3]
+			return self.finishMove(flat, turn, move[0], move[1], time1)
+		move = self.searchThreat(flat, turn)
+		if move is not None:
+			self.best_score = SCORE_FIVE
+			return self.finishMove(flat, turn, move[0], move[1], time1)
+
+		# moves are sorted by point score, deal them in turn so that every worker gets good moves
+		parts = [moves[i::self.workers] for i in range(self.workers)]
+		futures = [self.pool.submit(searchRootMoves, board, turn, self.number, part, time_limit, node_limit)
+				for part in parts if len(part) > 0]
+		pending = futures
+		while len(pending) > 0 and not self.stop:
+			done, pending = wait(pending, timeout=0.05)
+		if len(pending) > 0:
+			# queued tasks are cancelled, running tasks stop at their next node.
+			# wait for them, so the event can be cleared before the next search
+			for future in pending:
+				future.cancel()
+			self.worker_stop.set()
+			wait(pending)
+			self.worker_stop.clear()
+
+		results = [future.result() for future in futures if future.done() and not future.cancelled()]
+		searched = [result for result in results if result[0] is not None]
+		if len(searched) == 0:
+			self.best_score, self.search_depth = 0, 0
+			return moves[0]
+
+		best = max(searched, key=lambda result: getResultOrder(result, moves))
+		score, x, y = best[0], best[1], best[2]
+		self.best_score = score
+		# a worker stops at the depth where it proves a win or loss, only other results limit the depth
+		if score >= SCORE_FIVE:
+			self.search_depth = best[3]
+		else:
+			depths = [result[3] for result in searched if abs(result[0]) < SCORE_FIVE]
+			self.search_depth = min(depths) if len(depths) > 0 else best[3]
+		self.nodes = sum([result[4] for result in results])
+		self.belta = sum([result[5] for result in results])
+		time2 = time.time()
+		self.savePersist(flat, x, y, score)
+		if self.stats_enabled:
+			self.mergeStats([result[6] for result in results], best[6], time2 - time1)
+		DEBUG(DEBUG_WARN, 'time[%.2f] %d(%d, %d), score[%d] depth[%d] workers[%d] nodes[%d]' % ((time2-time1), self.number, x, y, score, self.search_depth, len(results), self.nodes))
+		return (x, y)
+
+	# move found before splitting, its stats are made as single process search does
+	def finishMove(self, board, turn, x, y, time1):
+		if self.stats is not None:
+			self.finishStats(board, turn, x, y, time.time() - time1)
+		return (x, y)
+
+	# counters are the sum of all workers, pv is from the worker of the best move
+	def mergeStats(self, worker_stats, best_stats, used):
+		self.stats = SearchStats()
+		for stats in worker_stats:
+			self.stats.merge(stats)
+		self.stats.move, self.stats.score, self.stats.depth = best_stats.move, self.best_score, self.search_depth
+		self.stats.time = used
+		self.stats.pv = best_stats.pv
+		if self.stats_hook is not None:
+			self.stats_hook(self.stats)
@@ -0,0 +1,133 @@
+from OpeningBook import *
+from GameBoard import *
+import sqlite3
+import threading
+
+# search results saved in a sqlite file, so they can be used in later games and by other processes.
+# the key is the symmetry-normalized code of OpeningBook, the move is saved in the coordinate of the key's symmetry.
+# when the entry number is over size, the least recently used entries are removed.
+# the AI may search in another thread than the one which creates it, the connection is shared by
+# all threads and used by one of them at a time. a sqlite error never stops a search, the cache is skipped
+PERSIST_EVICT_RATIO = 0.1 # ratio of entries removed when the cache is full
+PERSIST_TIMEOUT = 5 # seconds to wait for the lock of another process
+
+class PersistentCache():
+	def __init__(self, path, chess_len, size, readonly=False):
+		self.path = path
+		self.len = chess_len
+		self.size = size
+		self.readonly = readonly
+		self.hash = BookHash(chess_len)
+		self.db = None
+		self.lock = threading.Lock()
+		self.count = 0
+		self.used = 0
+		with self.lock:
+			self.connect()
+
+	# a missing or locked file, or a file whose table is not created yet by its writer, is an empty cache.
+	# return False if the file can't be used now, it is tried again at the next get or set
+	def connect(self):
+		if self.db is not None:
+			return True
+		db = None
+		try:
+			if self.readonly:
+				# read only processes can share the file with a writer
+				db = sqlite3.connect('file:%s?mode=ro' % self.path, uri=True, timeout=PERSIST_TIMEOUT, check_same_thread=False)
+			else:
+				db = sqlite3.connect(self.path, timeout=PERSIST_TIMEOUT, check_same_thread=False)
+				db.execute('PRAGMA journal_mode=WAL')
+				db.execute('CREATE TABLE IF NOT EXISTS entry (key INTEGER PRIMARY KEY, chess_len INTEGER, '
+					'depth INTEGER, score INTEGER, x INTEGER, y INTEGER, used INTEGER)')
+				db.execute('CREATE INDEX IF NOT EXISTS entry_used ON entry (used)')
+				db.commit()
+			self.count = db.execute('SELECT COUNT(*) FROM entry').fetchone()[0]
+			self.used = db.execute('SELECT COALESCE(MAX(used), 0) FROM entry').fetchone()[0]
+		except sqlite3.Error:
+			if db is not None:
+				db.close()
+			return False
+		self.db = db
+		return True
+
+	def close(self):
+		with self.lock:
+			if self.db is not None:
+				self.db.close()
+				self.db = None
+
+	# sqlite integer is signed 64 bits
+	def getKey(self, board):
+		key, index = self.hash.getKey(board)
+		if key >= 2**63:
+			key -= 2**64
+		return key, index
+
+	# return (x, y, depth, score) saved for board, or None
+	def get(self, board):
+		with self.lock:
+			if not self.connect():
+				return None
+			return self.getEntry(board)
+
+	def getEntry(self, board):
+		key, index = self.getKey(board)
+		try:
+			row = self.db.execute('SELECT depth, score, x, y FROM entry WHERE key = ? AND chess_len = ?', (key, self.len)).fetchone()
+		except sqlite3.Error:
+			# file is locked by a writer, search as there is no cache
+			return None
+		if row is None:
+			return None
+		depth, score, x, y = row
+		x, y = getSymmetryPoint(getInverseSymmetry(index), x, y, self.len)
+		if board[y][x] != 0:
+			return None
+		if not self.readonly:
+			self.used += 1
+			try:
+				self.db.execute('UPDATE entry SET used = ? WHERE key = ?', (self.used, key))
+				self.db.commit()
+			except sqlite3.Error:
+				# another process keeps the file locked, the entry is used without moving it in LRU order
+				self.rollback()
+		return (x, y, depth, score)
+
+	# entry of a deeper search is not replaced
+	def set(self, board, x, y, depth, score):
+		with self.lock:
+			if self.readonly or not self.connect():
+				return
+			self.setEntry(board, x, y, depth, score)
+
+	def setEntry(self, board, x, y, depth, score):
+		key, index = self.getKey(board)
+		x, y = getSymmetryPoint(index, x, y, self.len)
+		self.used += 1
+		count = self.count
+		try:
+			row = self.db.execute('SELECT depth FROM entry WHERE key = ?', (key,)).fetchone()
+			if row is None:
+				self.db.execute('INSERT INTO entry VALUES (?, ?, ?, ?, ?, ?, ?)', (key, self.len, depth, score, x, y, self.used))
+				self.count += 1
+			elif row[0] <= depth:
+				self.db.execute('UPDATE entry SET depth = ?, score = ?, x = ?, y = ?, used = ? WHERE key = ?', (depth, score, x, y, self.used, key))
+			if self.count > self.size:
+				self.evict()
+			self.db.commit()
+		except sqlite3.Error:
+			# another process keeps the file locked, the result is not saved
+			self.rollback()
+			self.count = count
+
+	def rollback(self):
+		try:
+			self.db.rollback()
+		except sqlite3.Error:
+			pass
+
+	def evict(self):
+		num = max(1, int(self.size * PERSIST_EVICT_RATIO))
+		self.db.execute('DELETE FROM entry WHERE key IN (SELECT key FROM entry ORDER BY used LIMIT ?)', (self.count - self.size + num,))
+		self.count = self.db.execute('SELECT COUNT(*) FROM entry').fetchone()[0]
@@ -0,0 +1,186 @@
+from GameBoard import *
+from ChessType import *
+
+# VCF: win by continuous fours, VCT: win by continuous threes and fours
+AI_VCF_DEPTH = 10 # max number of attacker moves
+AI_VCT_DEPTH = 4
+AI_VCF_LEAF_DEPTH = 4 # VCF searched at leaf of alpha beta search
+AI_THREAT_NODE_LIMIT = 5000
+AI_THREAT_LEAF_NODE_LIMIT = 100
+AI_THREAT_CACHE_SIZE = 1 << 16
+
+# line indexes of fixed len 9 (same as LINE_PATTERN) with empty middle, where a chess of mine at the middle
+# makes a four: 5 continuous positions through the middle get 4 chesses of mine and one empty position
+def createFourLines():
+	lines = [False for i in range(3**9)]
+	for index in range(3**9):
+		values = [(index // 3**i) % 3 for i in range(9)]
+		if values[4] != 0:
+			continue
+		for start in range(5):
+			window = values[start:start + 5]
+			if window.count(1) == 3 and window.count(0) == 2:
+				lines[index] = True
+				break
+	return lines
+
+FOUR_LINES = createFourLines()
+
+# search forced win of attacker, the defender must answer every threat of attacker.
+# it uses the board state of ChessAI: chess type count, candidate moves and point score cache
+class ThreatSolver():
+	def __init__(self, ai):
+		self.ai = ai
+		# (zobrist code, attacker, only_four): (depth, win move), win move is None if no win in depth
+		self.cache = {}
+		self.nodes = 0
+		self.node_limit = 0
+
+	# return the first move of attacker to win by continuous fours, or None
+	def searchVCF(self, board, attacker, depth=AI_VCF_DEPTH, node_limit=AI_THREAT_NODE_LIMIT):
+		self.nodes = 0
+		self.node_limit = node_limit
+		return self.searchAttack(board, attacker, depth, True)
+
+	# return the first move of attacker to win by continuous threes and fours, or None
+	def searchVCT(self, board, attacker, depth=AI_VCT_DEPTH, node_limit=AI_THREAT_NODE_LIMIT):
+		self.nodes = 0
+		self.node_limit = node_limit
+		return self.searchAttack(board, attacker, depth, False)
+
+	def isStopped(self):
+		return self.nodes >= self.node_limit or self.ai.isStopped()
+
+	# positions where player gets five, they are always next to a chess of player
+	def getFivePoints(self, board, player):
+		points = []
+		count = self.ai.board_count[player-1]
+		if count[FOUR] + count[SFOUR] == 0:
+			return points
+		for (x, y) in self.ai.candidates:
+			if board[y][x] == 0:
+				mscore, oscore = self.ai.evaluatePointScore(board, x, y, player, 3 - player)
+				if mscore >= SCORE_FIVE:
+					points.append((x, y))
+		return sorted(points)
+
+	# positions where player gets a four, or a live three if not only_four
+	def getThreats(self, board, player, only_four):
+		scores = {}
+		for (x, y) in self.ai.candidates:
+			if board[y][x] == 0:
+				mscore, oscore = self.ai.evaluatePointScore(board, x, y, player, 3 - player)
+				if mscore >= SCORE_SFOUR or (not only_four and mscore >= SCORE_THREE):
+					scores[(x, y)] = mscore
+		for (x, y) in self.getSplitFourPoints(board, player):
+			scores[(x, y)] = max(scores.get((x, y), 0), SCORE_SFOUR)
+		moves = [(mscore, x, y) for ((x, y), mscore) in scores.items()]
+		moves.sort(reverse=True)
+		return moves
+
+	# positions where player gets a four which is not next to the chess at the middle of line, e.g. the
+	# last position of XXX_X. point score has no chess type for them, and they can be out of the neighbor
+	# range of candidate moves. such a four needs 3 chesses of player within 5 positions of a line
+	def getSplitFourPoints(self, board, player):
+		ai = self.ai
+		points = set()
+		for dir_index in range(4):
+			dir_offset = ai.dir_offset[dir_index]
+			for stones in ai.line_stones[dir_index].values():
+				if len(stones) < 3:
+					continue
+				# (position in line, x, y) of the chesses of player
+				mine = []
+				for index in stones:
+					x, y = index % ai.len, index // ai.len
+					if board[y][x] == player:
+						mine.append((x if dir_offset[0] != 0 else y, x, y))
+				if len(mine) < 3:
+					continue
+				mine.sort()
+				for i in range(len(mine) - 2):
+					(first, x, y), last = mine[i], mine[i+2][0]
+					if last - first > 4:
+						continue
+					# the five positions of the four contain the 3 chesses
+					for j in range(last - first - 4, 5):
+						tmp_x, tmp_y = x + j * dir_offset[0], y + j * dir_offset[1]
+						if (tmp_x >= 0 and tmp_x < ai.len and tmp_y >= 0 and tmp_y < ai.len and board[tmp_y][tmp_x] == 0
+							and (tmp_x, tmp_y) not in points
+							and FOUR_LINES[ai.getLineIndex(board, tmp_x, tmp_y, dir_index, player, 3 - player)]):
+							points.add((tmp_x, tmp_y))
+		return points
+
+	def getCacheKey(self, attacker, only_four):
+		if not self.ai.cache:
+			return None
+		return (self.ai.zobrist.code, attacker, only_four)
+
+	# attacker to move
+	def searchAttack(self, board, attacker, depth, only_four):
+		self.nodes += 1
+		fives = self.getFivePoints(board, attacker)
+		if len(fives) > 0:
+			return fives[0]
+		if depth <= 0 or self.isStopped():
+			return None
+
+		key = self.getCacheKey(attacker, only_four)
+		if key is not None and key in self.cache:
+			cache_depth, move = self.cache[key]
+			if move is not None or cache_depth >= depth:
+				return move
+
+		# defender has a four, attacker must block it
+		blocks = self.getFivePoints(board, 3 - attacker)
+		if len(blocks) > 1:
+			moves = []
+		elif len(blocks) == 1:
+			moves = [(0, blocks[0][0], blocks[0][1])]
+		else:
+			moves = self.getThreats(board, attacker, only_four)
+
+		win_move = None
+		for (score, x, y) in moves:
+			self.ai.set(board, x, y, MAP_ENTRY_TYPE(attacker))
+			win = self.searchDefend(board, attacker, depth - 1, only_four)
+			self.ai.remove(board, x, y, MAP_ENTRY_TYPE(attacker))
+			if win:
+				win_move = (x, y)
+				break
+			if self.isStopped():
+				break
+
+		# a search stopped by limit is not a proof of no win
+		if key is not None and (win_move is not None or not self.isStopped()):
+			if len(self.cache) >= AI_THREAT_CACHE_SIZE:
+				self.cache = {}
+			self.cache[key] = (depth, win_move)
+		return win_move
+
+	# defender to move, return True if attacker wins after every defend move
+	def searchDefend(self, board, attacker, depth, only_four):
+		self.nodes += 1
+		defender = 3 - attacker
+		if len(self.getFivePoints(board, defender)) > 0:
+			return False
+
+		fives = self.getFivePoints(board, attacker)
+		if len(fives) > 1:
+			return True
+		if len(fives) == 1:
+			defends = fives
+		elif not only_four and self.ai.board_count[attacker-1][THREE] > 0:
+			# block the live three, or make a four to get the initiative
+			defends = [(x, y) for (score, x, y) in self.getThreats(board, attacker, True)]
+			defends += [(x, y) for (score, x, y) in self.getThreats(board, defender, True) if (x, y) not in defends]
+		else:
+			return False
+
+		for (x, y) in defends:
+			self.ai.set(board, x, y, MAP_ENTRY_TYPE(defender))
+			win = self.searchAttack(board, attacker, depth, only_four)
+			self.ai.remove(board, x, y, MAP_ENTRY_TYPE(defender))
+			if win is None:
+				return False
+		return True
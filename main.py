@@ -1,8 +1,13 @@
 import pygame
+import argparse
+import threading
+import time
 from pygame.locals import *
 from GameMap import *
 from ChessAI import *
+from ParallelAI import *
 
+AI_MOVE_EVENT = pygame.USEREVENT + 1 # posted by AIWorker when the move is ready
 
 class Button():
 	def __init__(self, screen, text, x, y, color, enable):
@@ -12,7 +17,7 @@ class Button():
 		self.button_color = color
 		self.text_color = (255, 255, 255)
 		self.enable = enable
-		self.font = pygame.font.SysFont(None, BUTTON_HEIGHT*2//3)
+		self.font = getFont(BUTTON_HEIGHT*2//3)
 		
 		self.rect = pygame.Rect(0, 0, self.width, self.height)
 		self.rect.topleft = (x, y)
@@ -59,9 +64,15 @@ class GiveupButton(Button):
 		
 	def click(self, game):
 		if self.enable:
+			# user gives up while AI is thinking, AI wins
+			user_turn = not (game.mode == USER_VS_AI_MODE and game.AI_worker.isRunning())
+			game.AI_worker.cancel()
 			game.is_play = False
 			if game.winner is None:
-				game.winner = game.map.reverseTurn(game.player)
+				if user_turn:
+					game.winner = game.map.reverseTurn(game.player)
+				else:
+					game.winner = game.player
 			self.msg_image = self.font.render(self.text, True, self.text_color, self.button_color[1])
 			self.enable = False
 			return True
@@ -72,26 +83,78 @@ class GiveupButton(Button):
 			self.msg_image = self.font.render(self.text, True, self.text_color, self.button_color[0])
 			self.enable = True
 
+# run AI search in a thread, so the game keeps drawing and handling events while AI is thinking.
+# an AI_MOVE_EVENT wakes up the game loop when the move is ready
+class AIWorker():
+	def __init__(self, AI):
+		self.AI = AI
+		self.thread = None
+		self.result = None
+
+	def start(self, board, turn):
+		# AI searches on its own copy of board
+		board = [line[:] for line in board]
+		self.result = None
+		self.thread = threading.Thread(target=self.run, args=(board, turn), daemon=True)
+		self.thread.start()
+
+	def run(self, board, turn):
+		self.result = self.AI.findBestChess(board, turn)
+		pygame.event.post(pygame.event.Event(AI_MOVE_EVENT))
+
+	def isRunning(self):
+		return self.thread is not None and self.thread.is_alive()
+
+	# return the move when search is finished, else None. the thread may be still alive after setting result
+	def poll(self):
+		if self.thread is None or self.result is None:
+			return None
+		self.thread = None
+		return self.result
+
+	def cancel(self):
+		while self.isRunning():
+			self.AI.stop = True
+			self.thread.join(0.01)
+		self.thread = None
+		self.result = None
+
 class Game():
-	def __init__(self, caption, play_mode, AI_first):
+	def __init__(self, caption, play_mode, AI_first, chess_len=CHESS_LEN):
 		pygame.init()
-		self.screen = pygame.display.set_mode([SCREEN_WIDTH, SCREEN_HEIGHT])
+		self.map = Map(chess_len, chess_len)
+		self.map_width = self.map.map_width
+		self.screen_height = self.map.map_height
+		self.screen = pygame.display.set_mode([self.map_width + INFO_WIDTH, self.screen_height])
 		pygame.display.set_caption(caption)
-		self.clock = pygame.time.Clock()
 		self.mode = play_mode
 		self.buttons = []
-		self.buttons.append(StartButton(self.screen, 'Start', MAP_WIDTH + 30, 15))
-		self.buttons.append(GiveupButton(self.screen, 'Giveup', MAP_WIDTH + 30, BUTTON_HEIGHT + 45))
+		self.buttons.append(StartButton(self.screen, 'Start', self.map_width + 30, 15))
+		self.buttons.append(GiveupButton(self.screen, 'Giveup', self.map_width + 30, BUTTON_HEIGHT + 45))
 		self.is_play = False
 
-		self.map = Map(CHESS_LEN, CHESS_LEN)
 		self.player = MAP_ENTRY_TYPE.MAP_PLAYER_ONE
 		self.action = None
-		self.AI = ChessAI(CHESS_LEN)
+		if AI_PARALLEL_WORKERS > 1:
+			self.AI = ParallelAI(chess_len, AI_PARALLEL_WORKERS, AI_USE_BITBOARD)
+		elif AI_USE_BITBOARD:
+			self.AI = BitBoardAI(chess_len)
+		else:
+			self.AI = ChessAI(chess_len)
 		self.AI_first = AI_first
+		self.AI_worker = AIWorker(self.AI)
 		self.winner = None
+		# state of the info area and mouse position drawn last time, only changed parts are drawn
+		self.info = None
+		self.cursor = None
+		# frames drawn and CPU time of the game process in the last second
+		self.frames = 0
+		self.counter_time = time.time()
+		self.counter_cpu = time.process_time()
+		self.counter_text = ''
 	
 	def start(self):
+		self.AI_worker.cancel()
 		self.is_play = True
 		self.player = MAP_ENTRY_TYPE.MAP_PLAYER_ONE
 		self.map.reset()
@@ -101,54 +164,125 @@ class Game():
 		else:
 			self.useAI = False
 
+	# update the game and draw the changed parts of screen, return the rects to update
+	# it is called after events, so the AI starts in the same call as the move before it
 	def play(self):
-		self.clock.tick(60)
-		
-		light_yellow = (247, 238, 214)
-		pygame.draw.rect(self.screen, light_yellow, pygame.Rect(0, 0, MAP_WIDTH, SCREEN_HEIGHT))
-		pygame.draw.rect(self.screen, (255, 255, 255), pygame.Rect(MAP_WIDTH, 0, INFO_WIDTH, SCREEN_HEIGHT))
-		
-		for button in self.buttons:
-			button.draw()
+		thinking = False
+		cursor = None
 		
 		if self.is_play and not self.isOver():
-			if self.useAI:
-				x, y = self.AI.findBestChess(self.map.map, self.player)
-				self.checkClick(x, y, True)
-				if self.mode == USER_VS_AI_MODE:
-					self.useAI = False
-			
 			if self.mode != AI_VS_AI_MODE:
-				if self.action is not None:
+				# user can not play while AI is thinking
+				if self.useAI:
+					self.action = None
+				elif self.action is not None:
 					self.checkClick(self.action[0], self.action[1])
 					self.action = None
+
+			if self.useAI:
+				move = self.AI_worker.poll()
+				if move is not None:
+					self.checkClick(move[0], move[1], True)
 					if self.mode == USER_VS_AI_MODE:
-						self.showAIThink()
+						self.useAI = False
+				if self.useAI and not self.isOver():
+					if not self.AI_worker.isRunning():
+						self.AI_worker.start(self.map.map, self.player)
+					thinking = True
 
-				if not self.isOver():
-					self.changeMouseShow()
-			
+			if self.mode != AI_VS_AI_MODE:
+				if not self.isOver() and not self.useAI:
+					cursor = self.changeMouseShow()
+				else:
+					pygame.mouse.set_visible(True)
+
+		return self.draw(thinking, cursor)
+
+	# draw everything again, e.g. after the window is covered
+	def redraw(self):
+		self.map.redraw = True
+		self.info = None
+
+	def draw(self, thinking, cursor):
+		rects = []
+		info = ([button.enable for button in self.buttons], thinking, self.winner)
+		if info != self.info:
+			self.info = info
+			rects.append(self.drawInfo(thinking))
+
+		# cells under the mouse chess are drawn again when it moves or one of them changes
+		draw_cursor = cursor != self.cursor or (cursor is not None and (len(self.map.dirty) > 0 or self.map.redraw))
+		if draw_cursor:
+			if self.cursor is not None:
+				self.map.markRect(self.getCursorRect(self.cursor))
+			if cursor is not None:
+				self.map.markRect(self.getCursorRect(cursor))
+		rects += self.map.drawDirty(self.screen)
+		if len(rects) > 0:
+			self.frames += 1
+		if SHOW_COUNTER and time.time() - self.counter_time >= 1:
+			self.updateCounter()
+			rects.append(self.showCounter())
+		if draw_cursor and cursor is not None:
+			light_red = (213, 90, 107)
+			# only cells of map are drawn again, the mouse chess must not cover the info area
+			self.screen.set_clip(pygame.Rect(0, 0, self.map_width, self.screen_height))
+			pygame.draw.circle(self.screen, light_red, cursor, self.map.chess_radius)
+			self.screen.set_clip(None)
+		self.cursor = cursor
+		return rects
+
+	def drawInfo(self, thinking):
+		rect = pygame.Rect(self.map_width, 0, INFO_WIDTH, self.screen_height)
+		self.screen.fill((255, 255, 255), rect)
+		for button in self.buttons:
+			button.draw()
+		if thinking:
+			self.showAIThink()
 		if self.isOver():
 			self.showWinner()
+		if SHOW_COUNTER:
+			self.showCounter()
+		return rect
 
-		self.map.drawBackground(self.screen)
-		self.map.drawChess(self.screen)
+	def updateCounter(self):
+		now, cpu = time.time(), time.process_time()
+		used = now - self.counter_time
+		self.counter_text = 'fps %.1f  cpu %d%%' % (self.frames / used, (cpu - self.counter_cpu) / used * 100)
+		self.frames, self.counter_time, self.counter_cpu = 0, now, cpu
 
-	
+	def showCounter(self):
+		rect = pygame.Rect(self.map_width, self.screen_height - 25, INFO_WIDTH, 25)
+		self.screen.fill((255, 255, 255), rect)
+		self.showFont(self.counter_text, self.map_width + 25, self.screen_height - 22, 20)
+		return rect
+
+	# milliseconds to wait for events before the counter is updated, 0 to wait until an event
+	def getWaitTime(self):
+		if not SHOW_COUNTER:
+			return 0
+		return max(1, int((self.counter_time + 1 - time.time()) * 1000))
+
+	def getCursorRect(self, pos):
+		radius = self.map.chess_radius
+		return (pos[0] - radius, pos[1] - radius, radius * 2 + 1, radius * 2 + 1)
+
+	# return the mouse position if a chess can be put there, else None
 	def changeMouseShow(self):
 		map_x, map_y = pygame.mouse.get_pos()
 		x, y = self.map.MapPosToIndex(map_x, map_y)
 		if self.map.isInMap(map_x, map_y) and self.map.isEmpty(x, y):
 			pygame.mouse.set_visible(False)
-			light_red = (213, 90, 107)
-			pos, radius = (map_x, map_y), CHESS_RADIUS
-			pygame.draw.circle(self.screen, light_red, pos, radius)
-		else:
-			pygame.mouse.set_visible(True)
+			return (map_x, map_y)
+		pygame.mouse.set_visible(True)
+		return None
 	
 	def checkClick(self,x, y, isAI=False):
 		self.AI.click(self.map, x, y, self.player)
-		if self.AI.isWin(self.map.map, self.player):
+		# only the last chess can make five
+		five = self.map.getFive(x, y)
+		if five is not None:
+			self.map.setFive(five)
 			self.winner = self.player
 			self.click_button(self.buttons[1])
 		else:	
@@ -166,7 +300,7 @@ class Game():
 		return self.winner is not None
 
 	def showFont(self, text, location_x, locaiton_y, height):
-		font = pygame.font.SysFont(None, height)
+		font = getFont(height)
 		font_image = font.render(text, True, (0, 0, 255), (255, 255, 255))
 		font_image_rect = font_image.get_rect()
 		font_image_rect.x = location_x
@@ -174,14 +308,14 @@ class Game():
 		self.screen.blit(font_image, font_image_rect)
 
 	def showAIThink(self):
-		self.showFont('AI is thinking...', MAP_WIDTH + 25, SCREEN_HEIGHT//2-30, 30)
+		self.showFont('AI is thinking...', self.map_width + 25, self.screen_height//2-30, 30)
 
 	def showWinner(self):
 		if self.winner == MAP_ENTRY_TYPE.MAP_PLAYER_ONE:
 			str = 'Winner is White'
 		else:
 			str = 'Winner is Black'
-		self.showFont(str, MAP_WIDTH + 25, SCREEN_HEIGHT - 60, 30)
+		self.showFont(str, self.map_width + 25, self.screen_height - 60, 30)
 		pygame.mouse.set_visible(True)
 	
 	def click_button(self, button):
@@ -196,16 +330,26 @@ class Game():
 				self.click_button(button)
 				break
 			
-game = Game("FIVE CHESS " + GAME_VERSION, GAME_PLAY_MODE, AI_RUN_FIRST)
-while True:
-	game.play()
-	pygame.display.update()
+# worker processes of ParallelAI may import this module, only the main process runs the game
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='five chess game')
+	parser.add_argument('--size', type=int, default=CHESS_LEN, help='number of lines of the board')
+	args = parser.parse_args()
+	game = Game("FIVE CHESS " + GAME_VERSION, GAME_PLAY_MODE, AI_RUN_FIRST, args.size)
+	while True:
+		rects = game.play()
+		if len(rects) > 0:
+			pygame.display.update(rects)
 	
-	for event in pygame.event.get():
-		if event.type == pygame.QUIT:
-			pygame.quit()
-			exit()
-		elif event.type == pygame.MOUSEBUTTONDOWN:
-			mouse_x, mouse_y = pygame.mouse.get_pos()
-			game.mouseClick(mouse_x, mouse_y)
-			game.check_buttons(mouse_x, mouse_y)
\ No newline at end of file
+		# sleep until something happens: user input, AI_MOVE_EVENT or the time to update counter
+		events = [pygame.event.wait(game.getWaitTime())] + pygame.event.get()
+		for event in events:
+			if event.type == pygame.QUIT:
+				pygame.quit()
+				exit()
+			elif event.type == pygame.VIDEOEXPOSE:
+				game.redraw()
+			elif event.type == pygame.MOUSEBUTTONDOWN:
+				mouse_x, mouse_y = pygame.mouse.get_pos()
+				game.mouseClick(mouse_x, mouse_y)
+				game.check_buttons(mouse_x, mouse_y)
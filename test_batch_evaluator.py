@@ -0,0 +1,30 @@
+import pytest
+from random import Random
+
+np = pytest.importorskip('numpy')
+
+from BatchEvaluator import *
+
+# boards of random chesses, few chesses are mostly twos and threes, more chesses make fours and fives
+TEST_SEED = 2020
+TEST_BOARDS = 500
+
+def createBoards(chess_len, num, seed):
+	rand = Random(seed)
+	boards, turns = [], []
+	for i in range(num):
+		board = [[0 for x in range(chess_len)] for y in range(chess_len)]
+		for j in range(rand.randint(0, 60)):
+			board[rand.randrange(chess_len)][rand.randrange(chess_len)] = rand.randint(1, 2)
+		boards.append(board)
+		turns.append(rand.randint(1, 2))
+	return boards, turns
+
+def test_batch_evaluator_matches_evaluate():
+	boards, turns = createBoards(CHESS_LEN, TEST_BOARDS, TEST_SEED)
+	scores = BatchEvaluator(CHESS_LEN).evaluate(np.array(boards), np.array(turns))
+	ai = ChessAI(CHESS_LEN, False)
+	for board, turn, score in zip(boards, turns, scores):
+		flat = ai.toBoard(board)
+		ai.initBoard(flat)
+		assert score == ai.evaluate(flat, MAP_ENTRY_TYPE(turn)), (board, turn)
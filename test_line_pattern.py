@@ -0,0 +1,66 @@
+from ChessAI import *
+
+# every line of fixed len 9 with mine at the middle is put on the board at centre, edge and corner cells,
+# analysisLine2 must give the same chess types and analysized range as analysisLine1.
+# out of range positions are opponent, so only lines with opponent there can be put near the border
+TEST_CELLS = [(7, 7), (0, 7), (7, 14), (0, 0), (14, 0)]
+
+def getLineValues(index, mine, opponent):
+	values = []
+	for i in range(9):
+		value = (index // 3**i) % 3
+		if value == 1:
+			values.append(mine)
+		elif value == 2:
+			values.append(opponent)
+		else:
+			values.append(0)
+	return values
+
+# positions of the line in range, None if the line can't be put at (x, y)
+def getLinePositions(ai, x, y, dir_index, values, opponent):
+	dir_offset = ai.dir_offset[dir_index]
+	positions = []
+	for i in range(9):
+		tmp_x, tmp_y = x + (i - 4) * dir_offset[0], y + (i - 4) * dir_offset[1]
+		if tmp_x >= 0 and tmp_x < ai.len and tmp_y >= 0 and tmp_y < ai.len:
+			positions.append((tmp_x, tmp_y, values[i]))
+		elif values[i] != opponent:
+			return None
+	return positions
+
+def analysis(ai, method, board, x, y, dir_index, mine, opponent):
+	ai.record = {}
+	count = [0 for i in range(CHESS_TYPE_NUM)]
+	method(board, x, y, dir_index, ai.dir_offset[dir_index], mine, opponent, count)
+	return count, ai.record
+
+def checkBoard(board_class):
+	ai = ChessAI(CHESS_LEN, False)
+	board = board_class(CHESS_LEN)
+	checked = 0
+	for (x, y) in TEST_CELLS:
+		for dir_index in range(4):
+			for mine in (1, 2):
+				opponent = 3 - mine
+				for index in range(3**9):
+					if (index // 3**4) % 3 != 1:
+						continue
+					positions = getLinePositions(ai, x, y, dir_index, getLineValues(index, mine, opponent), opponent)
+					if positions is None:
+						continue
+					for (tmp_x, tmp_y, value) in positions:
+						board.put(tmp_x, tmp_y, value)
+					expected = analysis(ai, ai.analysisLine1, board, x, y, dir_index, mine, opponent)
+					result = analysis(ai, ai.analysisLine2, board, x, y, dir_index, mine, opponent)
+					assert result == expected, (board_class.__name__, x, y, dir_index, mine, index)
+					for (tmp_x, tmp_y, value) in positions:
+						board.put(tmp_x, tmp_y, 0)
+					checked += 1
+	return checked
+
+def test_line_pattern_flat_board():
+	assert checkBoard(FlatBoard) > 0
+
+def test_line_pattern_bit_board():
+	assert checkBoard(BitBoard) > 0